@@ -0,0 +1,209 @@
+import sys
+import json
+import math
+import time
+import random
+import logging
+import argparse
+import threading
+import tracemalloc
+from array import array
+from macro_core import (
+    CaptureSession, PlaybackScheduler, configure_logging, percentile,
+    CAPTURE_RING_SIZE, MOVE_BUCKET_NS, MOVE_TOLERANCE_PX
+)
+from macro_backends import FakeBackend
+
+# Records synthetic input fed through the FakeBackend's listeners instead of
+# pynput hooks and measures what recording costs the input hook chain:
+#   latency  time from handing an event to the listener until its callback
+#            returns (us), per callback kind, next to the cost of calling an
+#            empty function the same way
+#   loss     events dropped by the capture rings and events merged outside
+#            the reorder window
+#   memory   traced allocation growth per million events pushed (second pass
+#            under tracemalloc, so it does not distort the latencies)
+# The rings are single-producer, so there is one producer thread per ring, as
+# with pynput: a keyboard thread and a mouse thread.
+
+KEYS = 'abcdefghijklmnopqrstuvwxyz'
+CLICK_EVERY = 250  # Every Nth mouse event is a button press or release
+SCROLL_EVERY = 100  # Every Nth mouse event is a scroll
+
+def paced(rate_hz, seconds, emit):
+    # Calls emit(index) on absolute deadlines; when the producer falls behind the
+    # overdue events fire back to back, as they would from a busy hook thread
+    if rate_hz <= 0:
+        return
+    scheduler = PlaybackScheduler(spin_threshold_ns=0)
+    interval_ns = 1e9 / rate_hz
+    scheduler.start()
+    for index in range(int(rate_hz * seconds)):
+        scheduler.wait_until(int(index * interval_ns))
+        emit(index)
+
+def keyboard_producer(backend, rate_hz, seconds, latencies):
+    timings = latencies['key']
+
+    def emit(index):
+        callback = backend.press_key if index % 2 == 0 else backend.release_key
+        key = KEYS[(index // 2) % len(KEYS)]
+        started = time.perf_counter_ns()
+        callback(key)
+        timings.append(time.perf_counter_ns() - started)
+
+    paced(rate_hz, seconds, emit)
+
+def mouse_producer(backend, rate_hz, seconds, latencies, seed):
+    jitter = random.Random(seed)
+    moves, clicks, scrolls = latencies['move'], latencies['click'], latencies['scroll']
+    state = {'pressed': False}
+
+    def emit(index):
+        angle = index * 2 * math.pi / 2000
+        x = 800 + int(300 * math.cos(angle)) + jitter.randint(-2, 2)
+        y = 500 + int(300 * math.sin(angle)) + jitter.randint(-2, 2)
+        if index % CLICK_EVERY == 0:
+            state['pressed'] = not state['pressed']
+            started = time.perf_counter_ns()
+            backend.click_mouse(x, y, 'left', state['pressed'])
+            clicks.append(time.perf_counter_ns() - started)
+        elif index % SCROLL_EVERY == 0:
+            started = time.perf_counter_ns()
+            backend.scroll_mouse(x, y, 0, -1)
+            scrolls.append(time.perf_counter_ns() - started)
+        else:
+            started = time.perf_counter_ns()
+            backend.move_mouse(x, y)
+            moves.append(time.perf_counter_ns() - started)
+
+    paced(rate_hz, seconds, emit)
+
+def baseline_latency(count=100_000):
+    # The floor of the measurement: timing a call to an empty function
+    def noop(*args):
+        pass
+    timings = array('q')
+    for index in range(count):
+        started = time.perf_counter_ns()
+        noop(index, index)
+        timings.append(time.perf_counter_ns() - started)
+    return sorted(timings)
+
+def make_session(args):
+    return CaptureSession(
+        move_bucket_ns=int(args.move_bucket_ms * 1e6), move_tolerance_px=args.move_tolerance,
+        ring_size=args.ring_size, backend=FakeBackend()
+    )
+
+def run_capture(args, session, seed=1):
+    latencies = {kind: array('q') for kind in ('key', 'move', 'click', 'scroll')}
+    producers = [
+        threading.Thread(target=keyboard_producer, args=(session.backend, args.key_rate, args.seconds, latencies),
+                         name='keyboard-producer'),
+        threading.Thread(target=mouse_producer, args=(session.backend, args.mouse_rate, args.seconds, latencies, seed),
+                         name='mouse-producer'),
+    ]
+    session.start()
+    started_ns = time.perf_counter_ns()
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+    produced_ns = time.perf_counter_ns() - started_ns
+    session.stop()
+    drain_ns = time.perf_counter_ns() - started_ns - produced_ns
+    return session, latencies, produced_ns, drain_ns
+
+def measure_memory(args):
+    tracemalloc.start()
+    session = make_session(args)
+    # The preallocated rings are a fixed cost, not growth
+    before = tracemalloc.get_traced_memory()[0]
+    session, latencies, _, _ = run_capture(args, session)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # The benchmark's own latency samples are not the recorder's memory
+    current -= sum(sys.getsizeof(timings) for timings in latencies.values())
+    pushed = session.keyboard_ring.head + session.mouse_ring.head
+    return {
+        'rings_bytes': before,
+        'growth_bytes': current - before,
+        'peak_bytes': peak - before,
+        'per_million_mb': (current - before) / pushed * 1e6 / 1e6 if pushed else 0.0,
+        'stored': session.recorded_events(),
+    }
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        'count': len(timings),
+        'p50_us': percentile(timings, 0.5) / 1e3,
+        'p99_us': percentile(timings, 0.99) / 1e3,
+        'p999_us': percentile(timings, 0.999) / 1e3,
+        'max_us': timings[-1] / 1e3 if timings else 0.0,
+    }
+
+def run_benchmark(args):
+    baseline = baseline_latency()
+    session, latencies, produced_ns, drain_ns = run_capture(args, make_session(args))
+    pushed = session.keyboard_ring.head + session.mouse_ring.head
+    result = {
+        'key_rate': args.key_rate,
+        'mouse_rate': args.mouse_rate,
+        'achieved_rate': (pushed + session.dropped_events()) / (produced_ns / 1e9),
+        'pushed': pushed,
+        'stored': session.recorded_events(),
+        'dropped': session.dropped_events(),
+        'late': session.merger.late,
+        'high_water': max(session.keyboard_ring.high_water, session.mouse_ring.high_water),
+        'drain_ms': drain_ns / 1e6,
+        'baseline_p50_us': percentile(baseline, 0.5) / 1e3,
+        'latency': {kind: summarize(timings) for kind, timings in latencies.items()},
+    }
+    if not args.no_memory:
+        result['memory'] = measure_memory(args)
+    return result
+
+def print_report(result):
+    print(f"Offered {result['key_rate']} key + {result['mouse_rate']} mouse events/s, "
+          f"achieved {result['achieved_rate']:.0f}/s")
+    print(f"Pushed {result['pushed']}, stored {result['stored']} after move compression, "
+          f"dropped {result['dropped']}, late {result['late']}, ring high-water {result['high_water']}, "
+          f"drain after stop {result['drain_ms']:.1f} ms")
+    print(f"{'callback':<8} {'calls':>8} {'p50':>8} {'p99':>8} {'p99.9':>8} {'max':>9}   (us)")
+    for kind, stats in result['latency'].items():
+        print(f"{kind:<8} {stats['count']:>8} {stats['p50_us']:>8.2f} {stats['p99_us']:>8.2f} "
+              f"{stats['p999_us']:>8.2f} {stats['max_us']:>9.1f}")
+    print(f"{'(empty)':<8} {'':>8} {result['baseline_p50_us']:>8.2f}")
+    memory = result.get('memory')
+    if memory:
+        print(f"Memory: {memory['rings_bytes'] / 1e6:.2f} MB of rings, +{memory['growth_bytes'] / 1e6:.2f} MB retained ({memory['per_million_mb']:.1f} MB per "
+              f"million events pushed), peak +{memory['peak_bytes'] / 1e6:.2f} MB")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the recorder's capture path with synthetic input.")
+    parser.add_argument('--key-rate', type=int, default=2000, help="key events per second (default: %(default)s)")
+    parser.add_argument('--mouse-rate', type=int, default=8000, help="mouse events per second (default: %(default)s)")
+    parser.add_argument('--seconds', type=float, default=5.0, help="length of each pass (default: %(default)s)")
+    parser.add_argument('--ring-size', type=int, default=CAPTURE_RING_SIZE, help="capture ring capacity (power of two)")
+    parser.add_argument('--move-bucket-ms', type=float, default=MOVE_BUCKET_NS / 1e6)
+    parser.add_argument('--move-tolerance', type=float, default=MOVE_TOLERANCE_PX)
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass")
+    parser.add_argument('--json', action='store_true', help="print the result as JSON")
+    parser.add_argument('--log-file', help="also write the recorder's log to this file")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.log_file:
+        configure_logging(level=logging.INFO, filename=args.log_file)
+    result = run_benchmark(args)
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print_report(result)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import sys
+import json
+import math
+import time
+import logging
+import argparse
+from macro_core import (
+    MacroPlayer, EventBuffer, configure_logging, percentile,
+    EV_KEY_DOWN, EV_KEY_UP, EV_MOVE, TIMER_BACKENDS, BATCH_WINDOW_NS
+)
+from macro_backends import FakeBackend
+
+# Replays synthetic macros through MacroPlayer into the in-memory FakeBackend,
+# so the replay loop can be measured without touching a real desktop. Every
+# injected event is timestamped and compared with its deadline on the
+# scheduler's timeline:
+#   error   how late each action was injected (us), as percentiles
+#   drift   how late the last action of each repeat was (ms)
+#   rate    actions per second of wall time; 'flood' has no delays, so there
+#           it is the raw throughput of the replay loop
+#   cpu     process CPU time per second of wall time
+
+KEYS = 'abcdefghijklmnopqrstuvwxyz'
+
+def tap(events, timestamp_ns, index, hold_ns):
+    symbol = events.intern(KEYS[index % len(KEYS)])
+    events.append_event(EV_KEY_DOWN, timestamp_ns, symbol)
+    events.append_event(EV_KEY_UP, timestamp_ns + hold_ns, symbol)
+
+def keyboard_bursts(bursts=10, keys=20, key_ns=5_000_000, gap_ns=100_000_000):
+    # Fast typing: bursts of taps 5 ms apart, separated by short pauses
+    events = EventBuffer()
+    timestamp_ns = 0
+    for _ in range(bursts):
+        for index in range(keys):
+            tap(events, timestamp_ns, index, key_ns // 2)
+            timestamp_ns += key_ns
+        timestamp_ns += gap_ns
+    return events
+
+def mouse_path(seconds=2.0, rate_hz=1000, radius=200):
+    # A 1 kHz mouse stream tracing circles, as captured without compression
+    events = EventBuffer()
+    interval_ns = int(1e9 / rate_hz)
+    for index in range(int(seconds * rate_hz)):
+        angle = index * 2 * math.pi / rate_hz
+        events.append_event(
+            EV_MOVE, index * interval_ns, 500 + int(radius * math.cos(angle)), 500 + int(radius * math.sin(angle))
+        )
+    return events
+
+def idle_gaps(gaps=4, gap_ns=400_000_000):
+    # Single taps separated by long idle periods, i.e. mostly coarse waits
+    events = EventBuffer()
+    for index in range(gaps + 1):
+        tap(events, index * gap_ns, index, 1_000_000)
+    return events
+
+def flood(count=100_000):
+    # Zero-delay events: measures how fast the loop can dispatch at all
+    events = EventBuffer()
+    for index in range(count // 2):
+        events.append_event(EV_MOVE, 0, index % 1000, index % 700)
+        events.append_event(EV_KEY_DOWN if index % 2 == 0 else EV_KEY_UP, 0, events.intern('a'))
+    return events
+
+SCENARIOS = {
+    'keys': keyboard_bursts,
+    'mouse': mouse_path,
+    'idle': idle_gaps,
+    'flood': flood,
+}
+
+def run_scenario(name, repeat, timer, batch_window_ns=BATCH_WINDOW_NS):
+    events = SCENARIOS[name]()
+    backend = FakeBackend()
+    player = MacroPlayer(events, repeat, timer=timer, backend=backend, batch_window_ns=batch_window_ns)
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter_ns()
+    player.start()
+    player.wait()
+    wall_ns = time.perf_counter_ns() - wall_started
+    cpu = time.process_time() - cpu_started
+
+    scheduler = player.session.scheduler
+    count = len(events)
+    duration_ns = events.duration_ns()
+    deadlines = events.timestamps
+    errors = []
+    drift = []
+    for index, injected in enumerate(backend.injected[:count * repeat]):
+        called_ns = injected[0]
+        iteration, step = divmod(index, count)
+        error_ns = called_ns - (scheduler.origin_ns + iteration * duration_ns + deadlines[step])
+        errors.append(error_ns)
+        if step == count - 1:
+            drift.append(error_ns)
+    errors.sort()
+    return {
+        'scenario': name,
+        'timer': timer,
+        'actions': len(errors),
+        'wall_s': wall_ns / 1e9,
+        'rate': len(errors) / (wall_ns / 1e9),
+        'error_p50_us': percentile(errors, 0.5) / 1e3,
+        'error_p90_us': percentile(errors, 0.9) / 1e3,
+        'error_p99_us': percentile(errors, 0.99) / 1e3,
+        'error_max_us': errors[-1] / 1e3 if errors else 0.0,
+        'drift_ms': [round(value / 1e6, 3) for value in drift],
+        'batches': backend.batches,
+        'cpu': cpu / (wall_ns / 1e9),
+    }
+
+def print_table(results):
+    print(f"{'scenario':<8} {'timer':<7} {'actions':>8} {'rate/s':>10} {'p50':>8} {'p90':>8} {'p99':>8} "
+          f"{'max':>8} {'drift max':>10} {'cpu':>5}")
+    for result in results:
+        drift = max(result['drift_ms'], key=abs) if result['drift_ms'] else 0.0
+        print(f"{result['scenario']:<8} {result['timer']:<7} {result['actions']:>8} {result['rate']:>10.0f} "
+              f"{result['error_p50_us']:>8.1f} {result['error_p90_us']:>8.1f} {result['error_p99_us']:>8.1f} "
+              f"{result['error_max_us']:>8.1f} {drift:>8.3f}ms {result['cpu']:>5.0%}")
+    print("error columns: us late per action against the scheduler's timeline")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark MacroPlayer timing fidelity with fake controllers.")
+    parser.add_argument('scenarios', nargs='*', metavar='scenario',
+                        help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument('-n', '--repeat', type=int, default=3, help="repeats per scenario (default: %(default)s)")
+    parser.add_argument('--timer', action='append', choices=TIMER_BACKENDS,
+                        help="timer backend, may be given more than once (default: hybrid)")
+    parser.add_argument('--batch-window-ms', type=float, default=BATCH_WINDOW_NS / 1e6,
+                        help="batch actions this close together (default: %(default)s, -1 disables)")
+    parser.add_argument('--json', action='store_true', help="print one JSON object per run instead of a table")
+    parser.add_argument('--log-file', help="also write the player's log to this file")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenario: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    if args.log_file:
+        configure_logging(level=logging.INFO, filename=args.log_file)
+    results = []
+    for timer in args.timer or ['hybrid']:
+        for name in args.scenarios or SCENARIOS:
+            batch_window_ns = None if args.batch_window_ms < 0 else int(args.batch_window_ms * 1e6)
+            result = run_scenario(name, args.repeat, timer, batch_window_ns)
+            results.append(result)
+            if args.json:
+                print(json.dumps(result))
+    if not args.json:
+        print_table(results)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from macro_core import PlaybackSession, PlaybackScheduler
+
+# asyncio front end for orchestrators that run many macros per host. Every
+# running macro only contributes its next step to one shared timer heap, and a
+# single driver task sleeps until the earliest deadline, so N concurrent macros
+# cost one task on the event loop rather than N OS threads.
+
+# The loop's timers are only as precise as its selector (about 1 ms on Linux,
+# up to 15.6 ms on Windows); the driver spins for this final stretch instead.
+# Spinning blocks the loop, so keep it short or set it to 0.
+ASYNC_SPIN_THRESHOLD_NS = 1_000_000
+
+class AsyncPlayback:
+    # One macro scheduled on an AsyncPlaybackHub. Await it for the number of
+    # completed iterations; cancel() (or cancelling the awaiting task) stops it
+    # and releases any keys and buttons it still holds.
+    def __init__(self, hub, actions, repeat_count, speed=1.0, max_gap_ns=None, backend=None):
+        self.hub = hub
+        self.session = PlaybackSession(actions, repeat_count, speed=speed, max_gap_ns=max_gap_ns, backend=backend)
+        self.scheduler = PlaybackScheduler(self.session.control, spin_threshold_ns=0, max_gap_ns=max_gap_ns)
+        self.repeat_count = repeat_count
+        self.iteration = 0
+        self.index = 0  # Next step of the current iteration
+        self.plan = None
+        self.iteration_ns = 0
+        self.released = False
+        self.future = asyncio.get_running_loop().create_future()
+        self.future.add_done_callback(self.on_done)
+
+    def __await__(self):
+        return self.future.__await__()
+
+    def prepare(self):
+        self.session.keyboard_controller = self.session.backend.keyboard_controller()
+        self.session.mouse_controller = self.session.backend.mouse_controller()
+        plan = self.plan = self.session.compile_plan(self.session.actions)
+        self.iteration_ns = plan.duration_ns
+        self.scheduler.start()
+        return len(plan) > 0 and self.repeat_count > 0
+
+    def next_target_ns(self):
+        deadline_ns = self.iteration * self.iteration_ns + self.plan.deadline_ns(self.index)
+        return self.scheduler.target_ns(self.scheduler.clamp_gap(deadline_ns))
+
+    def advance(self):
+        # Run the due step; returns False once the macro has finished
+        self.session.run_step(self.plan, self.index)
+        self.index += 1
+        steps = len(self.plan)
+        self.session.progress.report(self.iteration * steps + self.index, self.repeat_count * steps)
+        if self.index == steps:
+            self.index = 0
+            self.iteration += 1
+            if self.iteration == self.repeat_count:
+                self.finish()
+                return False
+        return True
+
+    def finish(self):
+        if not self.future.done():
+            self.future.set_result(self.iteration)
+
+    def fail(self, error):
+        if not self.future.done():
+            self.future.set_exception(error)
+
+    def cancel(self):
+        # Release held input before returning so the caller sees a clean state
+        self.release(cancelled=True)
+        return self.future.cancel()
+
+    def done(self):
+        return self.future.done()
+
+    def on_done(self, future):
+        self.session.progress.flush()
+        self.release(cancelled=future.cancelled())
+
+    def release(self, cancelled):
+        if self.released:
+            return
+        self.released = True
+        if cancelled:
+            self.session.stop_playback()
+            logging.info(f"Async playback cancelled after {self.iteration} iterations")
+        if self.session.keyboard_controller is not None:
+            self.session.release_all(self.session.keyboard_controller, self.session.mouse_controller)
+
+class AsyncPlaybackHub:
+    # Shared timer heap of (wall-clock target ns, sequence, playback) entries and
+    # the driver task that executes them in deadline order
+    def __init__(self, spin_threshold_ns=ASYNC_SPIN_THRESHOLD_NS):
+        self.spin_threshold_ns = spin_threshold_ns
+        self.heap = []
+        self.sequence = itertools.count()
+        self.driver = None
+        self.sleeper = None
+
+    def play(self, actions, repeat_count=1, speed=1.0, max_gap_ns=None, backend=None):
+        playback = AsyncPlayback(self, actions, repeat_count, speed, max_gap_ns, backend)
+        try:
+            ready = playback.prepare()
+        except Exception as e:
+            playback.fail(e)
+            return playback
+        if not ready:
+            playback.finish()
+            return playback
+        self.schedule(playback)
+        if self.driver is None or self.driver.done():
+            self.driver = asyncio.get_running_loop().create_task(self.drive())
+        else:
+            self.wake()
+        return playback
+
+    def schedule(self, playback):
+        target_ns = playback.next_target_ns()
+        playback.session.progress.idle(target_ns - time.perf_counter_ns())
+        heapq.heappush(self.heap, (target_ns, next(self.sequence), playback))
+
+    def wake(self):
+        # A new macro may be due before the step the driver is sleeping for
+        if self.sleeper is not None and not self.sleeper.done():
+            self.sleeper.set_result(None)
+
+    async def sleep(self, seconds):
+        loop = asyncio.get_running_loop()
+        self.sleeper = loop.create_future()
+        timer = loop.call_later(seconds, self.wake)
+        try:
+            await self.sleeper
+        finally:
+            timer.cancel()
+            self.sleeper = None
+
+    async def drive(self):
+        heap = self.heap
+        while heap:
+            target_ns, _, playback = heap[0]
+            if playback.done():
+                heapq.heappop(heap)
+                continue
+            remaining = target_ns - time.perf_counter_ns()
+            if remaining > self.spin_threshold_ns:
+                await self.sleep((remaining - self.spin_threshold_ns) / 1e9)
+                continue
+            while time.perf_counter_ns() < target_ns:
+                pass
+            heapq.heappop(heap)
+            try:
+                if playback.advance():
+                    self.schedule(playback)
+            except Exception as e:
+                logging.error(f"Async playback error: {e}")
+                playback.fail(e)
+            # Let other tasks run between steps even when many are due at once
+            await asyncio.sleep(0)
+
+    def running(self):
+        return [playback for _, _, playback in self.heap if not playback.done()]
+
+    async def close(self):
+        for playback in self.running():
+            playback.cancel()
+        if self.driver is not None:
+            self.wake()
+            await asyncio.gather(self.driver, return_exceptions=True)
+
+async def play_async(actions, repeat_count=1, speed=1.0, max_gap_ns=None, hub=None, backend=None):
+    # Convenience coroutine for a single macro; pass a shared hub to multiplex
+    hub = hub or AsyncPlaybackHub()
+    return await hub.play(actions, repeat_count, speed, max_gap_ns, backend)
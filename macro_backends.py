@@ -0,0 +1,534 @@
+import os
+import re
+import glob
+import time
+import atexit
+import struct
+import logging
+import subprocess
+from contextlib import contextmanager
+
+# Input backends: everything the recorder and player need from the OS input
+# layer, behind one interface so the engines can run against something other
+# than a live desktop.
+#
+#   keyboard_listener(on_press, on_release)
+#   mouse_listener(on_move, on_click, on_scroll)
+#       Return a listener with start() and stop(). Callbacks receive the
+#       backend's own key and button objects, on the backend's threads.
+#   keyboard_controller()   press(key), release(key)
+#   mouse_controller()      settable position, press(button), release(button),
+#                           scroll(dx, dy)
+#   key(name), button(name)
+#       Resolve a recorded name to the backend's object, or None if unknown.
+#   key_name(key), button_name(button)
+#       The inverse, used when recording. Names follow pynput's: a character,
+#       or a Key/Button attribute name such as 'shift' or 'left'.
+
+# pynput is imported on first use by load_pynput(): on Linux it needs a running
+# display, and inspecting or converting macro files must work without one
+pynput_keyboard = None
+pynput_mouse = None
+
+def load_pynput():
+    global pynput_keyboard, pynput_mouse
+    if pynput_keyboard is None:
+        from pynput import keyboard, mouse
+        pynput_keyboard, pynput_mouse = keyboard, mouse
+    return pynput_keyboard, pynput_mouse
+
+class InputBackend:
+    name = None
+
+    def keyboard_listener(self, on_press, on_release):
+        raise NotImplementedError
+
+    def mouse_listener(self, on_move, on_click, on_scroll):
+        raise NotImplementedError
+
+    def keyboard_controller(self):
+        raise NotImplementedError
+
+    def mouse_controller(self):
+        raise NotImplementedError
+
+    def key(self, name):
+        raise NotImplementedError
+
+    def button(self, name):
+        raise NotImplementedError
+
+    def key_name(self, key):
+        raise NotImplementedError
+
+    def button_name(self, button):
+        raise NotImplementedError
+
+    @contextmanager
+    def batch(self):
+        # Events injected inside the block may be submitted together on exit
+        yield
+
+    def close(self):
+        pass
+
+class PynputBackend(InputBackend):
+    name = 'pynput'
+
+    def keyboard_listener(self, on_press, on_release):
+        keyboard, _ = load_pynput()
+        return keyboard.Listener(on_press=on_press, on_release=on_release)
+
+    def mouse_listener(self, on_move, on_click, on_scroll):
+        _, mouse = load_pynput()
+        return mouse.Listener(on_move=on_move, on_click=on_click, on_scroll=on_scroll)
+
+    def keyboard_controller(self):
+        keyboard, _ = load_pynput()
+        return keyboard.Controller()
+
+    def mouse_controller(self):
+        _, mouse = load_pynput()
+        return mouse.Controller()
+
+    def key(self, name):
+        if len(name) == 1:
+            return name
+        keyboard, _ = load_pynput()
+        if name.startswith('<') and name.endswith('>') and name[1:-1].isdigit():
+            # Keys without a character or name are recorded by virtual-key code
+            return keyboard.KeyCode.from_vk(int(name[1:-1]))
+        try:
+            return getattr(keyboard.Key, name.lower())
+        except AttributeError:
+            logging.error(f"Key mapping failed for: {name}")
+            return None  # Return None to indicate an unmapped key
+
+    def button(self, name):
+        _, mouse = load_pynput()
+        try:
+            return getattr(mouse.Button, name)
+        except AttributeError:
+            logging.error(f"Button mapping failed for: {name}")
+            return None  # Return None to indicate an unmapped button
+
+    def key_name(self, key):
+        try:
+            char = key.char
+        except AttributeError:
+            return str(key).replace('Key.', '')
+        # KeyCodes with only a virtual-key code have no char; str() gives '<65437>'
+        return char if char is not None else str(key)
+
+    def button_name(self, button):
+        return button.name
+
+class FakeListener:
+    def __init__(self, listeners, callbacks):
+        self.listeners = listeners
+        self.callbacks = callbacks
+
+    def start(self):
+        self.listeners.append(self)
+
+    def stop(self):
+        if self in self.listeners:
+            self.listeners.remove(self)
+
+class FakeKeyboardController:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def press(self, key):
+        self.backend.record('key_down', key)
+
+    def release(self, key):
+        self.backend.record('key_up', key)
+
+class FakeMouseController:
+    def __init__(self, backend):
+        self.backend = backend
+
+    @property
+    def position(self):
+        return self.backend.position
+
+    @position.setter
+    def position(self, position):
+        self.backend.position = position
+        self.backend.record('move', *position)
+
+    def press(self, button):
+        self.backend.record('mouse_down', button, *self.backend.position)
+
+    def release(self, button):
+        self.backend.record('mouse_up', button, *self.backend.position)
+
+    def scroll(self, dx, dy):
+        self.backend.record('scroll', dx, dy)
+
+class FakeBackend(InputBackend):
+    # Deterministic in-memory backend for headless tests and benchmarks. Keys and
+    # buttons are their names. Controllers append every injected event to
+    # injected as (timestamp_ns, action_type, *arguments), read from clock;
+    # the press_key()/move_mouse()/... methods feed synthetic input to the
+    # started listeners synchronously on the calling thread.
+    name = 'fake'
+
+    def __init__(self, clock=time.perf_counter_ns):
+        self.clock = clock
+        self.injected = []
+        self.batches = 0
+        self.position = (0, 0)
+        self.keyboard_listeners = []
+        self.mouse_listeners = []
+
+    def record(self, action_type, *arguments):
+        self.injected.append((self.clock(), action_type, *arguments))
+
+    def keyboard_listener(self, on_press, on_release):
+        return FakeListener(self.keyboard_listeners, (on_press, on_release))
+
+    def mouse_listener(self, on_move, on_click, on_scroll):
+        return FakeListener(self.mouse_listeners, (on_move, on_click, on_scroll))
+
+    def keyboard_controller(self):
+        return FakeKeyboardController(self)
+
+    def mouse_controller(self):
+        return FakeMouseController(self)
+
+    def key(self, name):
+        return name
+
+    def button(self, name):
+        return name
+
+    def key_name(self, key):
+        return key
+
+    def button_name(self, button):
+        return button
+
+    @contextmanager
+    def batch(self):
+        self.batches += 1
+        yield
+
+    # Synthetic input
+
+    def press_key(self, key):
+        for listener in self.keyboard_listeners:
+            listener.callbacks[0](key)
+
+    def release_key(self, key):
+        for listener in self.keyboard_listeners:
+            listener.callbacks[1](key)
+
+    def move_mouse(self, x, y):
+        for listener in self.mouse_listeners:
+            listener.callbacks[0](x, y)
+
+    def click_mouse(self, x, y, button, pressed):
+        for listener in self.mouse_listeners:
+            listener.callbacks[1](x, y, button, pressed)
+
+    def scroll_mouse(self, x, y, dx, dy):
+        for listener in self.mouse_listeners:
+            listener.callbacks[2](x, y, dx, dy)
+
+# Linux uinput: a virtual keyboard/pointer device fed with raw input_event
+# structs (struct timeval, __u16 type, __u16 code, __s32 value). Every injected
+# action is a group of events closed by SYN_REPORT, and each group (or a whole
+# batch() of them) goes to the kernel in a single write().
+UINPUT_PATH = '/dev/uinput'
+UINPUT_DEVICE_NAME = b'event-automation'
+UINPUT_SETTLE_SECONDS = 0.2  # Time for the desktop to pick up a new device
+# The desktop scales the absolute pointer axes onto the screen, so their range
+# must match the screen's size in pixels. None detects it (see
+# detect_screen_size); this is the fallback when detection finds nothing.
+UINPUT_SCREEN_SIZE = (1920, 1080)
+INPUT_EVENT = struct.Struct('llHHi')  # Native layout: timeval longs differ on 32-bit
+UINPUT_SETUP = struct.Struct('HHHH80sI')
+UINPUT_ABS_SETUP = struct.Struct('H2xiiiiii')
+
+EV_SYN, EV_KEY, EV_REL, EV_ABS = 0x00, 0x01, 0x02, 0x03
+SYN_REPORT = 0
+REL_HWHEEL, REL_WHEEL = 0x06, 0x08
+ABS_X, ABS_Y = 0x00, 0x01
+BUS_USB = 0x03
+
+# ioctl requests from linux/uinput.h
+UI_DEV_CREATE = 0x5501
+UI_DEV_DESTROY = 0x5502
+UI_DEV_SETUP = 0x405c5503
+UI_ABS_SETUP = 0x401c5504
+UI_SET_EVBIT = 0x40045564
+UI_SET_KEYBIT = 0x40045565
+UI_SET_RELBIT = 0x40045566
+UI_SET_ABSBIT = 0x40045567
+
+# pynput key names to linux/input-event-codes.h KEY_* codes
+UINPUT_KEYS = {
+    'esc': 1, 'backspace': 14, 'tab': 15, 'enter': 28, 'ctrl': 29, 'ctrl_l': 29, 'shift': 42, 'shift_l': 42,
+    'shift_r': 54, 'alt': 56, 'alt_l': 56, 'space': 57, 'caps_lock': 58,
+    'f1': 59, 'f2': 60, 'f3': 61, 'f4': 62, 'f5': 63, 'f6': 64, 'f7': 65, 'f8': 66, 'f9': 67, 'f10': 68,
+    'num_lock': 69, 'scroll_lock': 70, 'f11': 87, 'f12': 88, 'ctrl_r': 97, 'print_screen': 99, 'alt_r': 100,
+    'alt_gr': 100, 'home': 102, 'up': 103, 'page_up': 104, 'left': 105, 'right': 106, 'end': 107, 'down': 108,
+    'page_down': 109, 'insert': 110, 'delete': 111, 'media_volume_mute': 113, 'media_volume_down': 114,
+    'media_volume_up': 115, 'pause': 119, 'cmd': 125, 'cmd_l': 125, 'cmd_r': 126, 'menu': 127,
+    'media_next': 163, 'media_play_pause': 164, 'media_previous': 165,
+}
+# Printable characters on a US layout; shifted ones are sent as shift + base key
+UINPUT_CHARS = {
+    '1': 2, '2': 3, '3': 4, '4': 5, '5': 6, '6': 7, '7': 8, '8': 9, '9': 10, '0': 11, '-': 12, '=': 13,
+    'q': 16, 'w': 17, 'e': 18, 'r': 19, 't': 20, 'y': 21, 'u': 22, 'i': 23, 'o': 24, 'p': 25, '[': 26, ']': 27,
+    'a': 30, 's': 31, 'd': 32, 'f': 33, 'g': 34, 'h': 35, 'j': 36, 'k': 37, 'l': 38, ';': 39, "'": 40, '`': 41,
+    '\\': 43, 'z': 44, 'x': 45, 'c': 46, 'v': 47, 'b': 48, 'n': 49, 'm': 50, ',': 51, '.': 52, '/': 53,
+    ' ': 57, '\t': 15, '\n': 28,
+}
+UINPUT_SHIFTED = dict(zip('!@#$%^&*()_+{}:"~|<>?', '1234567890-=[];\'`\\,./'))
+UINPUT_BUTTONS = {'left': 0x110, 'right': 0x111, 'middle': 0x112, 'x1': 0x113, 'x2': 0x114}
+
+class UinputDevice:
+    # Owns the uinput file descriptor. emit() frames a group of (type, code,
+    # value) events with SYN_REPORT and writes it at once, or defers the write
+    # while a batch() is open so the whole batch goes out in one write().
+    def __init__(self, fd, owned=False):
+        self.fd = fd
+        self.owned = owned  # Created here, so destroyed and closed by close()
+        self.pending = bytearray()
+        self.depth = 0
+        self.writes = 0
+        self.events = 0
+        self.syn_report = INPUT_EVENT.pack(0, 0, EV_SYN, SYN_REPORT, 0)
+
+    @classmethod
+    def create(cls, path=UINPUT_PATH, screen_size=UINPUT_SCREEN_SIZE):
+        import fcntl  # Unix only; the rest of this module must import everywhere
+        fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        try:
+            for event_type in (EV_SYN, EV_KEY, EV_REL, EV_ABS):
+                fcntl.ioctl(fd, UI_SET_EVBIT, event_type)
+            codes = set(UINPUT_KEYS.values()) | set(UINPUT_CHARS.values()) | set(UINPUT_BUTTONS.values())
+            for code in sorted(codes):
+                fcntl.ioctl(fd, UI_SET_KEYBIT, code)
+            for axis in (REL_WHEEL, REL_HWHEEL):
+                fcntl.ioctl(fd, UI_SET_RELBIT, axis)
+            for axis, size in ((ABS_X, screen_size[0]), (ABS_Y, screen_size[1])):
+                fcntl.ioctl(fd, UI_SET_ABSBIT, axis)
+                fcntl.ioctl(fd, UI_ABS_SETUP, UINPUT_ABS_SETUP.pack(axis, 0, 0, size - 1, 0, 0, 0))
+            fcntl.ioctl(fd, UI_DEV_SETUP, UINPUT_SETUP.pack(BUS_USB, 0x1209, 0x0001, 1, UINPUT_DEVICE_NAME, 0))
+            fcntl.ioctl(fd, UI_DEV_CREATE)
+        except OSError:
+            os.close(fd)
+            raise
+        time.sleep(UINPUT_SETTLE_SECONDS)
+        logging.info(f"Created uinput device on {path} ({screen_size[0]}x{screen_size[1]} pointer)")
+        return cls(fd, owned=True)
+
+    def emit(self, events):
+        pack = INPUT_EVENT.pack
+        pending = self.pending
+        for event_type, code, value in events:
+            pending += pack(0, 0, event_type, code, value)
+        pending += self.syn_report
+        self.events += len(events)
+        if not self.depth:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        data = memoryview(self.pending)
+        while data:
+            written = os.write(self.fd, data)
+            data = data[written:]
+        data.release()
+        self.pending.clear()
+        self.writes += 1
+
+    @contextmanager
+    def batch(self):
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            if not self.depth:
+                self.flush()
+
+    def close(self):
+        if self.fd is None:
+            return
+        try:
+            self.flush()
+        finally:
+            if self.owned:
+                import fcntl
+                fcntl.ioctl(self.fd, UI_DEV_DESTROY)
+                os.close(self.fd)
+            logging.info(f"uinput device closed after {self.events} events in {self.writes} writes")
+            self.fd = None
+
+class UinputKeyboardController:
+    # Keys are tuples of KEY_* codes, pressed in order and released in reverse
+    def __init__(self, device):
+        self.device = device
+
+    def press(self, key):
+        self.device.emit([(EV_KEY, code, 1) for code in key])
+
+    def release(self, key):
+        self.device.emit([(EV_KEY, code, 0) for code in reversed(key)])
+
+class UinputMouseController:
+    def __init__(self, device):
+        self.device = device
+        self.current = (0, 0)  # uinput cannot read the pointer back; last position set
+
+    @property
+    def position(self):
+        return self.current
+
+    @position.setter
+    def position(self, position):
+        self.current = position
+        self.device.emit(((EV_ABS, ABS_X, position[0]), (EV_ABS, ABS_Y, position[1])))
+
+    def press(self, button):
+        self.device.emit(((EV_KEY, button, 1),))
+
+    def release(self, button):
+        self.device.emit(((EV_KEY, button, 0),))
+
+    def scroll(self, dx, dy):
+        events = []
+        if dy:
+            events.append((EV_REL, REL_WHEEL, dy))
+        if dx:
+            events.append((EV_REL, REL_HWHEEL, dx))
+        if events:
+            self.device.emit(events)
+
+def detect_screen_size():
+    # The X screen's current size (all monitors), else the mode of the first
+    # connected DRM output, else the framebuffer; None when nothing is found
+    if os.environ.get('DISPLAY'):
+        try:
+            output = subprocess.run(
+                ['xrandr', '--current'], capture_output=True, text=True, timeout=5, check=True
+            ).stdout
+            match = re.search(r'current (\d+) x (\d+)', output)
+            if match:
+                return int(match.group(1)), int(match.group(2))
+        except (OSError, subprocess.SubprocessError) as e:
+            logging.debug("xrandr unavailable: %s", e)
+    for status_path in sorted(glob.glob('/sys/class/drm/card*-*/status')):
+        try:
+            with open(status_path) as f:
+                if f.read().strip() != 'connected':
+                    continue
+            with open(os.path.join(os.path.dirname(status_path), 'modes')) as f:
+                match = re.match(r'(\d+)x(\d+)', f.readline())
+            if match:
+                return int(match.group(1)), int(match.group(2))
+        except OSError:
+            continue
+    try:
+        with open('/sys/class/graphics/fb0/virtual_size') as f:
+            width, height = f.read().strip().split(',')
+        return int(width), int(height)
+    except (OSError, ValueError):
+        return None
+
+class UinputBackend(InputBackend):
+    # Output-only backend for Linux that bypasses X11: injects straight into a
+    # virtual uinput device. Pass fd to write to an already open descriptor
+    # instead (e.g. a pipe or file in tests); no device is set up then.
+    # screen_size is the (width, height) the pointer axes span; None detects it.
+    name = 'uinput'
+
+    def __init__(self, path=UINPUT_PATH, fd=None, screen_size=None):
+        self.path = path
+        self.screen_size = screen_size
+        self.device = UinputDevice(fd) if fd is not None else None
+
+    def open(self):
+        # Creates the device on first use and keeps it for later playbacks, so
+        # the desktop only has to discover it once
+        if self.device is None:
+            if self.screen_size is None:
+                self.screen_size = detect_screen_size()
+                if self.screen_size is None:
+                    self.screen_size = UINPUT_SCREEN_SIZE
+                    logging.warning(
+                        f"Could not detect the screen size; assuming {UINPUT_SCREEN_SIZE[0]}x{UINPUT_SCREEN_SIZE[1]}. "
+                        "Pass the real size or pointer positions will be scaled wrongly."
+                    )
+            self.device = UinputDevice.create(self.path, self.screen_size)
+            atexit.register(self.close)
+        return self.device
+
+    def keyboard_listener(self, on_press, on_release):
+        raise NotImplementedError("The uinput backend can only inject input; record with pynput")
+
+    def mouse_listener(self, on_move, on_click, on_scroll):
+        raise NotImplementedError("The uinput backend can only inject input; record with pynput")
+
+    def keyboard_controller(self):
+        return UinputKeyboardController(self.open())
+
+    def mouse_controller(self):
+        return UinputMouseController(self.open())
+
+    def key(self, name):
+        if name in UINPUT_CHARS:
+            return (UINPUT_CHARS[name],)
+        lower = name.lower()
+        if len(name) == 1 and lower in UINPUT_CHARS:
+            return (UINPUT_KEYS['shift'], UINPUT_CHARS[lower])
+        if name in UINPUT_SHIFTED:
+            return (UINPUT_KEYS['shift'], UINPUT_CHARS[UINPUT_SHIFTED[name]])
+        if lower in UINPUT_KEYS:
+            return (UINPUT_KEYS[lower],)
+        logging.error(f"Key mapping failed for: {name}")
+        return None
+
+    def button(self, name):
+        code = UINPUT_BUTTONS.get(name)
+        if code is None:
+            logging.error(f"Button mapping failed for: {name}")
+        return code
+
+    def key_name(self, key):
+        raise NotImplementedError("The uinput backend can only inject input")
+
+    def button_name(self, button):
+        raise NotImplementedError("The uinput backend can only inject input")
+
+    @contextmanager
+    def batch(self):
+        with self.open().batch():
+            yield
+
+    def close(self):
+        if self.device is not None:
+            self.device.close()
+            self.device = None
+
+INPUT_BACKENDS = {
+    PynputBackend.name: PynputBackend,
+    FakeBackend.name: FakeBackend,
+    UinputBackend.name: UinputBackend,
+}
+
+def get_backend(backend=None):
+    # Accepts a backend instance, a name from INPUT_BACKENDS, or None for pynput
+    if backend is None:
+        return PynputBackend()
+    if isinstance(backend, str):
+        if backend not in INPUT_BACKENDS:
+            raise ValueError(f"Unknown input backend: {backend}")
+        return INPUT_BACKENDS[backend]()
+    return backend
@@ -0,0 +1,367 @@
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+from collections import Counter
+from macro_core import (
+    MacroRecorder, MacroPlayer, JournalWriter, configure_logging, compress_moves, benchmark_timer,
+    save_macro, load_macro, export_json, import_json, load_journal, compact_journal,
+    EVENT_NAMES, EV_KEY_DOWN, EV_MOUSE_DOWN, MACRO_HEADER, MACRO_FILE_EXTENSION,
+    MACRO_JSON_EXTENSION, JOURNAL_EXTENSION, MOVE_BUCKET_NS, MOVE_TOLERANCE_PX, TIMER_BACKENDS,
+    MIN_PLAYBACK_SPEED, MAX_PLAYBACK_SPEED,
+    BATCH_WINDOW_NS, MACRO_PACKED_VERSION, MACRO_PACKINGS
+)
+from macro_backends import INPUT_BACKENDS, UinputBackend
+from macro_library import MacroLibrary, LIBRARY_PATH
+
+# Headless front end for unattended jobs. It only imports macro_core and
+# macro_backends, never PyQt5, and pynput is loaded by the record and play
+# commands alone.
+
+POLL_INTERVAL = 0.2  # Keeps Ctrl+C responsive on Windows, where joins block signals
+
+def read_actions(path):
+    if path.lower().endswith(MACRO_JSON_EXTENSION):
+        return import_json(path)
+    if path.lower().endswith(JOURNAL_EXTENSION):
+        return load_journal(path)
+    return load_macro(path)
+
+def write_actions(path, actions, packing=None):
+    if path.lower().endswith(MACRO_JSON_EXTENSION):
+        export_json(path, actions)
+    elif path.lower().endswith(JOURNAL_EXTENSION):
+        # Checkpointing empties the buffer it is given, so hand it a copy
+        JournalWriter(path).close(actions.copy())
+    else:
+        save_macro(path, actions, packing)
+
+def wait_interruptibly(engine, timeout=None):
+    # Returns True once the engine has finished, False on timeout; raises KeyboardInterrupt
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while engine.is_running():
+        remaining = POLL_INTERVAL if deadline is None else min(POLL_INTERVAL, deadline - time.monotonic())
+        if remaining <= 0:
+            return False
+        engine.wait(remaining)
+    return True
+
+def command_record(args):
+    journal_path = None
+    if args.stream:
+        # Stream to a journal next to the output; unless the output is the
+        # journal itself it is converted once recording stops
+        journal_path = args.output
+        if not journal_path.lower().endswith(JOURNAL_EXTENSION):
+            journal_path += JOURNAL_EXTENSION
+    recorder = MacroRecorder(
+        move_bucket_ns=int(args.move_bucket_ms * 1e6),
+        move_tolerance_px=args.move_tolerance,
+        journal_path=journal_path
+    )
+    recorder.start()
+    print(f"Recording to {args.output} - press Ctrl+C to stop"
+          + (f" (stops after {args.duration} s)" if args.duration else ""), file=sys.stderr)
+    try:
+        wait_interruptibly(recorder, args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recorder.stop()
+        recorder.wait()
+    if recorder.error is not None:
+        # Leave any existing output alone rather than overwrite it with nothing
+        print(f"Error: recording failed: {recorder.error}", file=sys.stderr)
+        return 1
+    session = recorder.session
+    if journal_path is None:
+        write_actions(args.output, recorder.actions, args.pack)
+    elif not session.journal_complete():
+        # A journal write failed and the rest of the recording is in memory:
+        # save journal + memory, and keep the journal as it is
+        output = args.output
+        if output == journal_path:
+            output = journal_path[:-len(JOURNAL_EXTENSION)] + MACRO_FILE_EXTENSION
+        write_actions(output, session.recorded_actions(), args.pack)
+        print(f"Journal {journal_path} is incomplete; saved the whole recording to {output}", file=sys.stderr)
+    elif journal_path != args.output:
+        if args.output.lower().endswith(MACRO_JSON_EXTENSION) or args.pack:
+            write_actions(args.output, load_journal(journal_path), args.pack)
+        else:
+            compact_journal(journal_path, args.output)
+        os.remove(journal_path)
+    print(f"Recorded {session.recorded_events()} actions ({session.dropped_events()} dropped)", file=sys.stderr)
+    return 0
+
+def parse_screen_size(text):
+    match = re.fullmatch(r'(\d+)x(\d+)', text.strip().lower())
+    if not match or not int(match.group(1)) or not int(match.group(2)):
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, e.g. 2560x1440, not {text!r}")
+    return int(match.group(1)), int(match.group(2))
+
+def parse_speed(text):
+    try:
+        speed = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid speed: {text!r}")
+    if not MIN_PLAYBACK_SPEED <= speed <= MAX_PLAYBACK_SPEED:
+        raise argparse.ArgumentTypeError(f"must be between {MIN_PLAYBACK_SPEED} and {MAX_PLAYBACK_SPEED}, got {text}")
+    return speed
+
+def parse_max_gap(text):
+    # Seconds; 0 turns the gap clamp off
+    try:
+        max_gap = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid gap: {text!r}")
+    if not 0 <= max_gap < float('inf'):
+        raise argparse.ArgumentTypeError(f"must be a positive number of seconds or 0 for off, got {text}")
+    return max_gap
+
+def command_play(args):
+    if args.library:
+        actions = MacroLibrary(args.db).open(args.input)
+    else:
+        actions = read_actions(args.input)
+    if not actions:
+        print(f"No actions to play in {args.input}", file=sys.stderr)
+        return 1
+    backend = args.backend
+    if backend == 'uinput':
+        backend = UinputBackend(screen_size=args.screen_size)
+    elif args.screen_size:
+        print("--screen-size only applies to the uinput backend", file=sys.stderr)
+    player = MacroPlayer(
+        actions, args.repeat, speed=args.speed,
+        max_gap_ns=int(args.max_gap * 1e9) if args.max_gap else None, timer=args.timer, backend=backend,
+        batch_window_ns=None if args.batch_window_ms < 0 else int(args.batch_window_ms * 1e6)
+    )
+    player.subscribe('status', lambda status: print(status, file=sys.stderr))
+    player.start()
+    try:
+        wait_interruptibly(player)
+    except KeyboardInterrupt:
+        player.stop_playback()
+    player.wait()
+    if player.session.error is not None:
+        return 1
+    return 0 if player.session.is_playing else 130
+
+def command_info(args):
+    if args.input.lower().endswith(MACRO_JSON_EXTENSION):
+        actions = import_json(args.input)
+        print(f"File:      {args.input} (JSON)")
+    elif args.input.lower().endswith(JOURNAL_EXTENSION):
+        actions = load_journal(args.input)
+        print(f"File:      {args.input} (journal)")
+    else:
+        actions = load_macro(args.input)
+        with open(args.input, 'rb') as f:
+            version, flags = MACRO_HEADER.unpack(f.read(MACRO_HEADER.size))[1:3]
+        if version == MACRO_PACKED_VERSION:
+            packing = next((name for name, value in MACRO_PACKINGS.items() if value == flags), flags)
+            print(f"File:      {args.input} (binary v{version}, {packing}, {os.path.getsize(args.input)} bytes)")
+        else:
+            print(f"File:      {args.input} (binary v{version}, {os.path.getsize(args.input)} bytes)")
+    print(f"Events:    {len(actions)}")
+    print(f"Duration:  {actions.duration_ns() / 1e9:.3f} s")
+    counts = Counter(actions.types)
+    for code, name in EVENT_NAMES.items():
+        if counts[code]:
+            print(f"  {name:<11} {counts[code]}")
+    if args.symbols:
+        pressed = Counter(
+            actions.symbols[symbol]
+            for code, symbol in zip(actions.types, actions.arg0)
+            if code == EV_KEY_DOWN or code == EV_MOUSE_DOWN
+        )
+        for name, count in pressed.most_common():
+            print(f"  {name!r:<11} {count}")
+    return 0
+
+def command_convert(args):
+    actions = read_actions(args.input)
+    if args.compress_moves:
+        before = len(actions)
+        actions = compress_moves(actions, int(args.move_bucket_ms * 1e6), args.move_tolerance)
+        print(f"Compressed {before} events to {len(actions)}", file=sys.stderr)
+    write_actions(args.output, actions, args.pack)
+    return 0
+
+def command_timer(args):
+    # Timing jitter of each backend on this host, in microseconds late per deadline
+    print(f"{args.count} deadlines {args.interval_ms} ms apart; lateness in us")
+    print(f"{'timer':<8} {'spin':>7} {'p50':>8} {'p90':>8} {'p99':>8} {'p99.9':>8} {'max':>8} {'cpu':>5}")
+    for timer in args.timers or TIMER_BACKENDS:
+        result = benchmark_timer(timer, args.count, int(args.interval_ms * 1e6))
+        spin = 'all' if timer == 'spin' else f"{result['spin_threshold_ns'] / 1e3:.0f}"
+        print(f"{timer:<8} {spin:>7} " + " ".join(
+            f"{result[key] / 1e3:>8.1f}" for key in ('p50', 'p90', 'p99', 'p999', 'max')
+        ) + f" {result['cpu']:>5.0%}")
+    return 0
+
+def format_created(created_ns):
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(created_ns / 1e9))
+
+def command_library_list(args, library):
+    entries = library.entries(search=args.search, tag=args.tag, key=args.key, limit=args.limit)
+    print(f"{'id':>5} {'name':<24} {'created':<16} {'duration':>9} {'events':>8}  tags")
+    for entry in entries:
+        print(f"{entry['id']:>5} {entry['name']:<24} {format_created(entry['created_ns']):<16} "
+              f"{entry['duration_ns'] / 1e9:>8.1f}s {entry['events']:>8}  {', '.join(entry['tags'])}")
+    print(f"{len(entries)} of {len(library)} macros", file=sys.stderr)
+    return 0
+
+def command_library_add(args, library):
+    name = args.name or os.path.splitext(os.path.basename(args.input))[0]
+    macro_id = library.add(name, read_actions(args.input), args.tag or (), args.pack)
+    print(f"Added {args.input} as #{macro_id} {name!r}", file=sys.stderr)
+    return 0
+
+def command_library_show(args, library):
+    entry = library.entry(args.macro)
+    print(f"Macro:     #{entry['id']} {entry['name']}")
+    print(f"Created:   {format_created(entry['created_ns'])}")
+    print(f"Duration:  {entry['duration_ns'] / 1e9:.3f} s")
+    print(f"Events:    {entry['events']} ({entry['key_presses']} key presses, {entry['moves']} moves, "
+          f"{entry['clicks']} clicks, {entry['scrolls']} scrolls)")
+    print(f"Tags:      {', '.join(entry['tags'])}")
+    for key, presses in library.key_histogram(entry['id']):
+        print(f"  {key!r:<11} {presses}")
+    return 0
+
+def command_library_export(args, library):
+    write_actions(args.output, library.open(args.macro), args.pack)
+    return 0
+
+def command_library_tag(args, library):
+    library.tag(args.macro, args.tags, remove=args.remove)
+    return 0
+
+def command_library_remove(args, library):
+    library.remove(args.macro)
+    return 0
+
+def command_library(args):
+    library = MacroLibrary(args.db)
+    try:
+        return args.library_handler(args, library)
+    finally:
+        library.close()
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Record and replay keyboard/mouse macros without the GUI.")
+    parser.add_argument('--log-file', default='macro_recorder.log', help="log file (default: %(default)s)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="log every captured and replayed event")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record = commands.add_parser('record', help="record input until Ctrl+C or --duration")
+    record.add_argument('output', help=f"output file ({MACRO_FILE_EXTENSION}, {MACRO_JSON_EXTENSION} or {JOURNAL_EXTENSION})")
+    record.add_argument('--duration', type=float, help="stop after this many seconds")
+    record.add_argument('--stream', action='store_true',
+                        help=f"checkpoint events to a {JOURNAL_EXTENSION} file while recording, "
+                             "for long sessions and crash recovery")
+    record.add_argument('--pack', choices=list(MACRO_PACKINGS),
+                        help="save a packed (delta + varint) binary file, optionally block-compressed")
+    record.add_argument('--move-bucket-ms', type=float, default=MOVE_BUCKET_NS / 1e6,
+                        help="coalesce mouse moves closer than this (default: %(default)s, 0 disables)")
+    record.add_argument('--move-tolerance', type=float, default=MOVE_TOLERANCE_PX,
+                        help="mouse path simplification tolerance in pixels (default: %(default)s, 0 disables)")
+    record.set_defaults(handler=command_record)
+
+    play = commands.add_parser('play', help="replay a macro file")
+    play.add_argument('input', help="macro file, or macro name or #id with --library")
+    play.add_argument('--library', action='store_true', help="play a macro from the library")
+    play.add_argument('--db', default=LIBRARY_PATH, help="library database (default: %(default)s)")
+    play.add_argument('-n', '--repeat', type=int, default=1, help="repeat count (default: %(default)s)")
+    play.add_argument('--speed', type=parse_speed, default=1.0,
+                      help=f"speed multiplier, {MIN_PLAYBACK_SPEED} to {MAX_PLAYBACK_SPEED} (default: %(default)s)")
+    play.add_argument('--max-gap', type=parse_max_gap, default=0.0,
+                      help="shorten idle gaps longer than this many seconds (default: off)")
+    play.add_argument('--timer', choices=TIMER_BACKENDS, default='hybrid',
+                      help="wait strategy: calibrated sleep+spin, sleep only or spin only (default: %(default)s)")
+    play.add_argument('--backend', choices=list(INPUT_BACKENDS), default='pynput',
+                      help="where to inject input; 'fake' replays with real timing but injects nothing (default: %(default)s)")
+    play.add_argument('--screen-size', type=parse_screen_size, metavar='WxH',
+                      help="screen size the uinput pointer axes span (default: detected)")
+    play.add_argument('--batch-window-ms', type=float, default=BATCH_WINDOW_NS / 1e6,
+                      help="inject actions this close together as one batch (default: %(default)s, -1 disables)")
+    play.set_defaults(handler=command_play)
+
+    info = commands.add_parser('info', help="print a summary of a macro file")
+    info.add_argument('input')
+    info.add_argument('--symbols', action='store_true', help="also list key and button press counts")
+    info.set_defaults(handler=command_info)
+
+    convert = commands.add_parser('convert', help="convert between binary, JSON and journal macro files")
+    convert.add_argument('input')
+    convert.add_argument('output')
+    convert.add_argument('--compress-moves', action='store_true', help="re-run mouse move compression")
+    convert.add_argument('--pack', choices=list(MACRO_PACKINGS),
+                         help="write a packed (delta + varint) binary file, optionally block-compressed; "
+                              "smaller, but decoded on load instead of memory-mapped")
+    convert.add_argument('--move-bucket-ms', type=float, default=MOVE_BUCKET_NS / 1e6)
+    convert.add_argument('--move-tolerance', type=float, default=MOVE_TOLERANCE_PX)
+    convert.set_defaults(handler=command_convert)
+
+    timer = commands.add_parser('timer', help="calibrate and benchmark the playback timer backends")
+    timer.add_argument('timers', nargs='*', metavar='timer',
+                       help=f"backends to measure (default: all of {', '.join(TIMER_BACKENDS)})")
+    timer.add_argument('--count', type=int, default=1000, help="deadlines per backend (default: %(default)s)")
+    timer.add_argument('--interval-ms', type=float, default=1.0, help="spacing of the deadlines (default: %(default)s)")
+    timer.set_defaults(handler=command_timer)
+
+    library = commands.add_parser('library', help="browse and manage the macro library")
+    library.add_argument('--db', default=LIBRARY_PATH, help="library database (default: %(default)s)")
+    library.set_defaults(handler=command_library)
+    library_commands = library.add_subparsers(dest='library_command', required=True)
+
+    listing = library_commands.add_parser('list', help="list macros, newest first")
+    listing.add_argument('--search', help="part of the macro name")
+    listing.add_argument('--tag', help="only macros with this tag")
+    listing.add_argument('--key', help="only macros that press this key")
+    listing.add_argument('--limit', type=int, help="list at most this many")
+    listing.set_defaults(library_handler=command_library_list)
+
+    add = library_commands.add_parser('add', help="store a macro file in the library")
+    add.add_argument('input')
+    add.add_argument('--name', help="library name (default: the file name)")
+    add.add_argument('--tag', action='append', help="tag, may be given more than once")
+    add.add_argument('--pack', choices=list(MACRO_PACKINGS), help="store the payload packed")
+    add.set_defaults(library_handler=command_library_add)
+
+    show = library_commands.add_parser('show', help="print a macro's metadata and key histogram")
+    show.add_argument('macro', help="name or #id")
+    show.set_defaults(library_handler=command_library_show)
+
+    export = library_commands.add_parser('export', help="write a library macro to a file")
+    export.add_argument('macro', help="name or #id")
+    export.add_argument('output')
+    export.add_argument('--pack', choices=list(MACRO_PACKINGS))
+    export.set_defaults(library_handler=command_library_export)
+
+    tag = library_commands.add_parser('tag', help="add or remove tags")
+    tag.add_argument('macro', help="name or #id")
+    tag.add_argument('tags', nargs='+')
+    tag.add_argument('--remove', action='store_true', help="remove the tags instead")
+    tag.set_defaults(library_handler=command_library_tag)
+
+    remove = library_commands.add_parser('remove', help="delete a macro from the library")
+    remove.add_argument('macro', help="name or #id")
+    remove.set_defaults(library_handler=command_library_remove)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging(level=logging.DEBUG if args.verbose else logging.INFO, filename=args.log_file)
+    try:
+        return args.handler(args)
+    except (OSError, ValueError) as e:
+        logging.error(f"{args.command} failed: {e}")
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1794 @@
+import os
+import sys
+import json
+import time
+import mmap
+import heapq
+import queue
+import atexit
+import struct
+import logging
+import threading
+import zlib
+import logging.handlers
+from array import array
+from contextlib import contextmanager
+from itertools import accumulate
+from macro_backends import get_backend
+
+LOG_FILE = 'macro_recorder.log'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_QUEUE_SIZE = 10000  # Ring buffer capacity; the oldest records are dropped when full
+LOG_BATCH_SIZE = 256  # Maximum records written to disk in one batch
+
+class RingBufferQueueHandler(logging.handlers.QueueHandler):
+    # Used on the hot paths (input hooks, playback): records are enqueued as-is and
+    # formatted later on the listener thread. When the listener falls behind, the
+    # oldest queued record is discarded so callers never block on logging.
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+class BatchingFileHandler(logging.FileHandler):
+    # Runs on the listener thread: formatted lines are collected and written with a
+    # single write/flush once the queue has drained, the batch is full or a
+    # warning arrives, instead of one write per record
+    def __init__(self, filename, mode='a', log_queue=None, batch_size=LOG_BATCH_SIZE):
+        super().__init__(filename, mode, encoding='utf-8')
+        self.log_queue = log_queue
+        self.batch_size = batch_size
+        self.pending = []
+
+    def emit(self, record):
+        try:
+            self.pending.append(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+            return
+        if (len(self.pending) >= self.batch_size or record.levelno >= logging.WARNING
+                or self.log_queue is None or self.log_queue.empty()):
+            self.flush()
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self.pending and self.stream:
+                self.stream.write(''.join(self.pending))
+                self.pending.clear()
+            super().flush()
+        finally:
+            self.release()
+
+class LogListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Block rather than fail if the ring buffer is full at shutdown
+        self.queue.put(self._sentinel)
+
+def configure_logging(async_logging=True, level=logging.DEBUG, filename=LOG_FILE):
+    # Overwrite the log file on each run. In async mode the calling threads only
+    # enqueue records; formatting and disk I/O happen in batches on a background
+    # thread that is drained at interpreter exit.
+    if not async_logging:
+        logging.basicConfig(level=level, format=LOG_FORMAT, filename=filename, filemode='w')
+        return None
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    file_handler = BatchingFileHandler(filename, 'w', log_queue)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = LogListener(log_queue, file_handler)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(RingBufferQueueHandler(log_queue))
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+# Playback timing: sleep coarsely until this close to a deadline, then spin-wait
+SPIN_THRESHOLD_NS = 2_000_000  # 2 ms
+
+# Timer backends, i.e. how a PlaybackScheduler splits each wait:
+#   'hybrid'  condition-wait, then spin for a threshold calibrated on this host
+#   'sleep'   condition-wait only; no busy CPU, but inherits the OS timer granularity
+#   'spin'    busy-wait the whole gap (still honours stop, pause and speed changes)
+# An int selects a fixed spin threshold in ns instead.
+TIMER_BACKENDS = ('hybrid', 'sleep', 'spin')
+SPIN_FOREVER_NS = 1 << 62
+MIN_SPIN_THRESHOLD_NS = 200_000
+MAX_SPIN_THRESHOLD_NS = 20_000_000  # Above the 15.6 ms default Windows timer tick
+TIMER_CALIBRATION_DELAY_NS = 1_000_000
+TIMER_CALIBRATION_SAMPLES = 40
+TIMER_CALIBRATION_BUDGET_NS = 250_000_000  # Bounds calibration on coarse-timer hosts
+calibrated_spin_threshold_ns = None
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def calibrate_spin_threshold(samples=TIMER_CALIBRATION_SAMPLES, delay_ns=TIMER_CALIBRATION_DELAY_NS):
+    # Measures how far a timed condition wait (the scheduler's coarse wait)
+    # overshoots on this host and returns a spin threshold of twice its 99th
+    # percentile, leaving headroom for load spikes. The result is cached for
+    # the process.
+    global calibrated_spin_threshold_ns
+    condition = threading.Condition()
+    overshoots = []
+    started_ns = time.perf_counter_ns()
+    with condition:
+        for _ in range(samples):
+            before = time.perf_counter_ns()
+            condition.wait(delay_ns / 1e9)
+            after = time.perf_counter_ns()
+            overshoots.append(max(0, after - before - delay_ns))
+            if after - started_ns > TIMER_CALIBRATION_BUDGET_NS:
+                break
+    overshoots.sort()
+    worst_ns = percentile(overshoots, 0.99)
+    threshold_ns = min(MAX_SPIN_THRESHOLD_NS, max(MIN_SPIN_THRESHOLD_NS, worst_ns * 2))
+    calibrated_spin_threshold_ns = threshold_ns
+    logging.info(
+        f"Timer calibration: wait overshoot median {percentile(overshoots, 0.5) / 1e3:.0f} us, "
+        f"p99 {worst_ns / 1e3:.0f} us over {len(overshoots)} samples; spin threshold {threshold_ns / 1e3:.0f} us"
+    )
+    return threshold_ns
+
+def resolve_spin_threshold(timer):
+    if isinstance(timer, int):
+        return timer
+    if timer == 'hybrid':
+        return calibrated_spin_threshold_ns or calibrate_spin_threshold()
+    if timer == 'sleep':
+        return 0
+    if timer == 'spin':
+        return SPIN_FOREVER_NS
+    raise ValueError(f"Unknown timer backend: {timer}")
+
+# Playback speed multiplier limits offered by the GUI
+MIN_PLAYBACK_SPEED = 0.25
+MAX_PLAYBACK_SPEED = 50.0
+
+class PlaybackControl:
+    # Shared between the GUI thread and the playback thread. Every state change
+    # notifies the condition, so a scheduler waiting out a long recorded delay
+    # wakes immediately and re-evaluates what to do.
+    def __init__(self, speed=1.0):
+        self.check_speed(speed)
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.paused = False
+        self.speed = speed
+        self.stop_requested_ns = None
+        self.changes = 0  # Bumped on every state change; spinning waiters poll it
+
+    def stop(self):
+        with self.condition:
+            if self.stop_requested_ns is None:
+                self.stop_requested_ns = time.perf_counter_ns()
+            self.stopped = True
+            self.changes += 1
+            self.condition.notify_all()
+
+    def pause(self):
+        with self.condition:
+            self.paused = True
+            self.changes += 1
+            self.condition.notify_all()
+
+    def resume(self):
+        with self.condition:
+            self.paused = False
+            self.changes += 1
+            self.condition.notify_all()
+
+    @staticmethod
+    def check_speed(speed):
+        # Also rejects NaN, which fails every comparison
+        if not MIN_PLAYBACK_SPEED <= speed <= MAX_PLAYBACK_SPEED:
+            raise ValueError(
+                f"Playback speed must be between {MIN_PLAYBACK_SPEED} and {MAX_PLAYBACK_SPEED}, got {speed}"
+            )
+
+    def set_speed(self, speed):
+        self.check_speed(speed)
+        with self.condition:
+            self.speed = speed
+            self.changes += 1
+            self.condition.notify_all()
+
+class PlaybackScheduler:
+    # Waits on absolute deadlines measured on the monotonic perf_counter_ns clock,
+    # so per-action overhead never accumulates. Deadlines are given on the recorded
+    # timeline (ns from playback start) and mapped to wall-clock targets here:
+    # idle gaps longer than max_gap_ns are shortened to max_gap_ns, and the result
+    # is divided by the control's speed factor. The action list itself is never
+    # rewritten. The coarse wait is a condition wait on the PlaybackControl, so
+    # stop, pause and speed changes take effect immediately; a speed change
+    # re-anchors the timeline at the current position and time spent paused
+    # shifts the remaining timeline. The final spin also watches the control, so
+    # even the 'spin' timer backend reacts to those changes within microseconds.
+    def __init__(self, control=None, spin_threshold_ns=SPIN_THRESHOLD_NS, max_gap_ns=None):
+        self.check_max_gap(max_gap_ns)
+        self.control = control or PlaybackControl()
+        self.spin_threshold_ns = spin_threshold_ns
+        self.max_gap_ns = max_gap_ns or None
+        self.origin_ns = None
+        self.anchor_wall_ns = 0  # Wall-clock time of anchor_recorded_ns
+        self.anchor_recorded_ns = 0  # Position on the (gap-clamped) recorded timeline
+        self.speed = 1.0
+        self.previous_deadline_ns = 0
+        self.removed_ns = 0  # Idle time cut out by the gap clamp so far
+        self.last_lateness_ns = 0
+        self.max_lateness_ns = 0
+        self.total_lateness_ns = 0
+        self.waits = 0
+
+    @staticmethod
+    def check_max_gap(max_gap_ns):
+        # None or 0 turns the clamp off; a negative limit would collapse every
+        # gap into a zero-delay burst. Also rejects NaN.
+        if max_gap_ns is not None and not max_gap_ns >= 0:
+            raise ValueError(f"Maximum gap must be positive, got {max_gap_ns}")
+
+    def start(self):
+        self.origin_ns = self.anchor_wall_ns = time.perf_counter_ns()
+        self.anchor_recorded_ns = 0
+        self.speed = self.control.speed
+        self.previous_deadline_ns = 0
+        self.removed_ns = 0
+        self.last_lateness_ns = 0
+        self.max_lateness_ns = 0
+        self.total_lateness_ns = 0
+        self.waits = 0
+
+    def clamp_gap(self, deadline_ns):
+        # Map a recorded deadline onto the clamped timeline, remembering the cut
+        gap_ns = deadline_ns - self.previous_deadline_ns
+        if self.max_gap_ns and gap_ns > self.max_gap_ns:
+            self.removed_ns += gap_ns - self.max_gap_ns
+        self.previous_deadline_ns = deadline_ns
+        return deadline_ns - self.removed_ns
+
+    def target_ns(self, clamped_ns):
+        return self.anchor_wall_ns + int((clamped_ns - self.anchor_recorded_ns) / self.speed)
+
+    def rebase(self, speed):
+        now = time.perf_counter_ns()
+        self.anchor_recorded_ns += int((now - self.anchor_wall_ns) * self.speed)
+        self.anchor_wall_ns = now
+        self.speed = speed
+
+    def wait_until(self, deadline_ns):
+        # Returns False without waiting out the deadline if playback was stopped
+        control = self.control
+        clamped_ns = self.clamp_gap(deadline_ns)
+        while True:
+            if control.stopped:
+                return False
+            if (control.paused or control.speed != self.speed
+                    or self.target_ns(clamped_ns) - time.perf_counter_ns() > self.spin_threshold_ns):
+                with control.condition:
+                    while True:
+                        if control.stopped:
+                            return False
+                        if control.paused:
+                            paused_at = time.perf_counter_ns()
+                            while control.paused and not control.stopped:
+                                control.condition.wait()
+                            self.anchor_wall_ns += time.perf_counter_ns() - paused_at
+                            continue
+                        if control.speed != self.speed:
+                            self.rebase(control.speed)
+                        remaining = self.target_ns(clamped_ns) - time.perf_counter_ns()
+                        if remaining <= self.spin_threshold_ns:
+                            break
+                        control.condition.wait((remaining - self.spin_threshold_ns) / 1e9)
+            changes = control.changes
+            target = self.target_ns(clamped_ns)
+            now = time.perf_counter_ns()
+            while now < target and control.changes == changes:
+                now = time.perf_counter_ns()
+            if now >= target:
+                break
+        lateness = now - target
+        self.last_lateness_ns = lateness
+        self.total_lateness_ns += lateness
+        if lateness > self.max_lateness_ns:
+            self.max_lateness_ns = lateness
+        self.waits += 1
+        return True
+
+    def drift(self, deadline_ns):
+        # How far playback currently lags (positive) or leads the given deadline
+        gap_ns = deadline_ns - self.previous_deadline_ns
+        removed_ns = self.removed_ns
+        if self.max_gap_ns and gap_ns > self.max_gap_ns:
+            removed_ns += gap_ns - self.max_gap_ns
+        return time.perf_counter_ns() - self.target_ns(deadline_ns - removed_ns)
+
+    def mean_lateness_ns(self):
+        return self.total_lateness_ns // self.waits if self.waits else 0
+
+def benchmark_timer(timer, count=1000, interval_ns=1_000_000):
+    # Waits on count evenly spaced deadlines with the given backend and reports
+    # lateness percentiles (ns) plus the CPU time burnt per second of waiting
+    spin_threshold_ns = resolve_spin_threshold(timer)
+    scheduler = PlaybackScheduler(spin_threshold_ns=spin_threshold_ns)
+    lateness = []
+    cpu_started = time.process_time()
+    scheduler.start()
+    for index in range(1, count + 1):
+        scheduler.wait_until(index * interval_ns)
+        lateness.append(scheduler.last_lateness_ns)
+    wall_ns = time.perf_counter_ns() - scheduler.origin_ns
+    cpu = time.process_time() - cpu_started
+    lateness.sort()
+    return {
+        'timer': timer,
+        'spin_threshold_ns': spin_threshold_ns,
+        'p50': percentile(lateness, 0.5),
+        'p90': percentile(lateness, 0.9),
+        'p99': percentile(lateness, 0.99),
+        'p999': percentile(lateness, 0.999),
+        'max': lateness[-1] if lateness else 0,
+        'mean': scheduler.mean_lateness_ns(),
+        'cpu': cpu / (wall_ns / 1e9) if wall_ns else 0.0,
+    }
+
+# Event type codes used by the compact event store
+EV_KEY_DOWN = 1
+EV_KEY_UP = 2
+EV_MOVE = 3
+EV_MOUSE_DOWN = 4
+EV_MOUSE_UP = 5
+EV_SCROLL = 6
+
+EVENT_NAMES = {
+    EV_KEY_DOWN: 'key_down',
+    EV_KEY_UP: 'key_up',
+    EV_MOVE: 'move',
+    EV_MOUSE_DOWN: 'mouse_down',
+    EV_MOUSE_UP: 'mouse_up',
+    EV_SCROLL: 'scroll',
+}
+EVENT_CODES = {name: code for code, name in EVENT_NAMES.items()}
+
+class EventBuffer:
+    # Columnar event store: per event one uint8 type code, three int32 arguments
+    # and an int64 timestamp (ns offset from the start of the recording). Key and
+    # button names are interned into a small symbol table and stored by index.
+    #
+    #   key_down/key_up        arg0 = symbol
+    #   move                   arg0 = x, arg1 = y
+    #   mouse_down/mouse_up    arg0 = symbol, arg1 = x, arg2 = y
+    #   scroll                 arg0 = dx, arg1 = dy
+    #
+    # Iterating or indexing yields the legacy action tuples, e.g.
+    # ('move', x, y, delta), so existing consumers keep working.
+    def __init__(self, symbols=None):
+        self.types = array('B')
+        self.arg0 = array('i')
+        self.arg1 = array('i')
+        self.arg2 = array('i')
+        self.timestamps = array('q')
+        self.symbols = []
+        self.symbol_ids = {}
+        for name in symbols or ():
+            self.intern(name)
+
+    def intern(self, name):
+        symbol = self.symbol_ids.get(name)
+        if symbol is None:
+            symbol = len(self.symbols)
+            self.symbols.append(name)
+            self.symbol_ids[name] = symbol
+        return symbol
+
+    def append_event(self, code, timestamp_ns, arg0=0, arg1=0, arg2=0):
+        self.types.append(code)
+        self.arg0.append(arg0)
+        self.arg1.append(arg1)
+        self.arg2.append(arg2)
+        self.timestamps.append(timestamp_ns)
+
+    def append(self, action, timestamp_ns=None):
+        # Append a legacy action tuple; without an explicit timestamp the tuple's
+        # delta is added to the offset of the previous event
+        action_type = action[0]
+        code = EVENT_CODES.get(action_type)
+        if code is None:
+            raise ValueError(f"Unknown action type: {action_type}")
+        if timestamp_ns is None:
+            timestamp_ns = self.timestamps[-1] if self.timestamps else 0
+            if action[-1] > 0:
+                timestamp_ns += round(action[-1] * 1e9)
+        if code in (EV_KEY_DOWN, EV_KEY_UP):
+            self.append_event(code, timestamp_ns, self.intern(action[1]))
+        elif code in (EV_MOUSE_DOWN, EV_MOUSE_UP):
+            self.append_event(code, timestamp_ns, self.intern(action[1]), int(action[2]), int(action[3]))
+        else:
+            self.append_event(code, timestamp_ns, int(action[1]), int(action[2]))
+
+    @classmethod
+    def from_actions(cls, actions, timestamps=None):
+        if isinstance(actions, cls):
+            return actions
+        buffer = cls()
+        if timestamps is not None and len(timestamps) == len(actions):
+            for action, timestamp_ns in zip(actions, timestamps):
+                buffer.append(action, timestamp_ns)
+        else:
+            for action in actions:
+                buffer.append(action)
+        return buffer
+
+    def action(self, index):
+        code = self.types[index]
+        timestamp_ns = self.timestamps[index]
+        previous_ns = self.timestamps[index - 1] if index > 0 else 0
+        delta = (timestamp_ns - previous_ns) / 1e9
+        if code == EV_MOVE:
+            return ('move', self.arg0[index], self.arg1[index], delta)
+        if code == EV_KEY_DOWN or code == EV_KEY_UP:
+            return (EVENT_NAMES[code], self.symbols[self.arg0[index]], delta)
+        if code == EV_MOUSE_DOWN or code == EV_MOUSE_UP:
+            return (EVENT_NAMES[code], self.symbols[self.arg0[index]], self.arg1[index], self.arg2[index], delta)
+        return (EVENT_NAMES[code], self.arg0[index], self.arg1[index], delta)
+
+    def __len__(self):
+        return len(self.types)
+
+    def __iter__(self):
+        for index in range(len(self.types)):
+            yield self.action(index)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            if index < 0:
+                index += len(self.types)
+            if not 0 <= index < len(self.types):
+                raise IndexError("EventBuffer index out of range")
+            return self.action(index)
+        start, stop, step = index.indices(len(self.types))
+        if step != 1:
+            raise ValueError("EventBuffer slices must be contiguous")
+        # Rebase timestamps so the first event keeps its original delta
+        base_ns = self.timestamps[start - 1] if 0 < start <= stop else 0
+        sliced = EventBuffer(self.symbols)
+        sliced.types = self.copy_column(self.types, start, stop)
+        sliced.arg0 = self.copy_column(self.arg0, start, stop)
+        sliced.arg1 = self.copy_column(self.arg1, start, stop)
+        sliced.arg2 = self.copy_column(self.arg2, start, stop)
+        sliced.timestamps = self.copy_column(self.timestamps, start, stop)
+        if base_ns:
+            sliced.timestamps = array('q', (t - base_ns for t in sliced.timestamps))
+        return sliced
+
+    @staticmethod
+    def copy_column(column, start, stop):
+        # Columns are arrays, or memoryviews when the buffer is memory-mapped
+        copied = array(column.typecode if isinstance(column, array) else column.format)
+        copied.frombytes(memoryview(column)[start:stop].cast('B'))
+        return copied
+
+    def copy(self):
+        return self[:]
+
+    def duration_ns(self):
+        return self.timestamps[-1] if self.timestamps else 0
+
+    def nbytes(self):
+        columns = (self.types, self.arg0, self.arg1, self.arg2, self.timestamps)
+        return sum(len(column) * column.itemsize for column in columns)
+
+# Binary macro file format (all integers little-endian):
+#   header        magic, version, flags, symbol count, symbol table size,
+#                 event count, duration (ns)
+#   symbol table  per symbol: uint16 length + UTF-8 name, padded to 8 bytes
+#   events        fixed-width fields stored column by column, widest first so
+#                 every block stays aligned: int64 timestamps, int32 arg0,
+#                 int32 arg1, int32 arg2, uint8 type codes
+# Storing the records column-wise lets a memory-mapped file be viewed directly
+# as typed arrays, so loading does not decode or copy any events.
+#
+# Version 2 is the packed variant for archiving and sharing, several times
+# smaller but decoded into memory on load. The header flags hold the block
+# compression (see MACRO_PACKINGS) and the symbol table is unchanged; every
+# column then follows as one block (uint32 stored size + data). Timestamps and
+# arguments are delta-encoded against the previous event, zigzag-mapped to
+# unsigned (0, -1, 1, -2 -> 0, 1, 2, 3) and written as LEB128 varints; type
+# codes stay one byte each.
+MACRO_FILE_MAGIC = b'MACR'
+MACRO_FILE_VERSION = 1
+MACRO_PACKED_VERSION = 2
+MACRO_FILE_EXTENSION = '.macro'
+MACRO_HEADER = struct.Struct('<4sHHIIQq')
+MACRO_COLUMNS = (('timestamps', 'q'), ('arg0', 'i'), ('arg1', 'i'), ('arg2', 'i'), ('types', 'B'))
+
+def pack_symbols(symbols):
+    table = bytearray()
+    for name in symbols:
+        if not isinstance(name, str):
+            raise ValueError(f"Invalid key or button name: {name!r}")
+        encoded = name.encode('utf-8')
+        table += struct.pack('<H', len(encoded)) + encoded
+    table += bytes(-len(table) % 8)
+    return bytes(table)
+
+def unpack_symbols(data, count):
+    # Raises ValueError if count and the length prefixes don't fit in data
+    symbols = []
+    offset = 0
+    for _ in range(count):
+        if offset + 2 > len(data):
+            raise ValueError("symbol table is truncated")
+        (length,) = struct.unpack_from('<H', data, offset)
+        offset += 2
+        if offset + length > len(data):
+            raise ValueError("symbol table is truncated")
+        try:
+            symbols.append(bytes(data[offset:offset + length]).decode('utf-8'))
+        except UnicodeDecodeError as e:
+            raise ValueError(f"bad symbol name: {e}")
+        offset += length
+    return symbols
+
+def column_bytes(column, typecode):
+    # Little-endian bytes of an array or memoryview column
+    if sys.byteorder != 'little' and column.itemsize > 1:
+        column = array(typecode, column)
+        column.byteswap()
+    return column.tobytes() if isinstance(column, array) else bytes(column)
+
+@contextmanager
+def replacing(path, actions=None):
+    # Writes to a temporary file next to path and renames it over path once
+    # complete, so a failed save leaves the old file intact and a macro that is
+    # memory-mapped from path is never truncated under its views. Windows cannot
+    # replace a mapped file, so actions mapped from path are copied into memory
+    # and unmapped first.
+    if isinstance(actions, MappedEventBuffer) and os.path.exists(path) and os.path.samefile(actions.path, path):
+        actions.detach()
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+def save_macro(path, actions, packing=None):
+    # Without a packing the file is fixed-width (version 1) and can be mapped
+    if packing is not None:
+        return save_packed_macro(path, actions, packing)
+    actions = EventBuffer.from_actions(actions)
+    symbol_table = pack_symbols(actions.symbols)
+    with replacing(path, actions) as f:
+        f.write(MACRO_HEADER.pack(
+            MACRO_FILE_MAGIC, MACRO_FILE_VERSION, 0, len(actions.symbols),
+            len(symbol_table), len(actions), actions.duration_ns()
+        ))
+        f.write(symbol_table)
+        for name, typecode in MACRO_COLUMNS:
+            f.write(column_bytes(getattr(actions, name), typecode))
+    logging.info(f"Saved {len(actions)} actions to {path}")
+
+def read_macro_header(data, path):
+    if len(data) < MACRO_HEADER.size:
+        raise ValueError(f"Not a macro file: {path}")
+    magic, version, flags, symbol_count, symbols_size, event_count, duration_ns = MACRO_HEADER.unpack_from(data)
+    if magic != MACRO_FILE_MAGIC:
+        raise ValueError(f"Not a macro file: {path}")
+    if version != MACRO_FILE_VERSION:
+        raise ValueError(f"Unsupported macro file version {version}: {path}")
+    expected_size = MACRO_HEADER.size + symbols_size + event_count * sum(struct.calcsize(t) for _, t in MACRO_COLUMNS)
+    if len(data) < expected_size:
+        raise ValueError(f"Truncated macro file: {path}")
+    return symbol_count, symbols_size, event_count
+
+class MappedEventBuffer(EventBuffer):
+    # Read-only EventBuffer whose columns are views into a memory-mapped macro
+    # file. Replaying it touches the mapped pages directly; nothing is decoded
+    # up front and no per-event objects are kept.
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.mmap)
+        symbol_count, symbols_size, event_count = read_macro_header(view, path)
+        offset = MACRO_HEADER.size
+        try:
+            symbols = unpack_symbols(view[offset:offset + symbols_size], symbol_count)
+        except ValueError as e:
+            raise ValueError(f"Corrupt macro file {path}: {e}")
+        for name in symbols:
+            self.intern(name)
+        offset += symbols_size
+        for name, typecode in MACRO_COLUMNS:
+            size = event_count * struct.calcsize(typecode)
+            column = view[offset:offset + size].cast(typecode)
+            if sys.byteorder != 'little' and column.itemsize > 1:
+                column = array(typecode, column)
+                column.byteswap()
+            setattr(self, name, column)
+            offset += size
+
+    def append_event(self, code, timestamp_ns, arg0=0, arg1=0, arg2=0):
+        raise TypeError("Memory-mapped macros are read-only; copy() them to edit")
+
+    def detach(self):
+        # Copies the events into memory and lets go of the mapping; the buffer
+        # stays usable. Views already handed out, e.g. the columns a running
+        # PlaybackPlan reads, stay valid: the file is only unmapped once the
+        # last of them is gone.
+        for name, _ in MACRO_COLUMNS:
+            column = getattr(self, name)
+            if isinstance(column, memoryview):
+                setattr(self, name, self.copy_column(column, 0, len(column)))
+        self.mmap = None
+
+    def close(self):
+        for name, typecode in MACRO_COLUMNS:
+            column = getattr(self, name)
+            if isinstance(column, memoryview):
+                column.release()
+            setattr(self, name, array(typecode))
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+
+# Editable JSON form: each event is its action tuple with the delta replaced by
+# the absolute offset (ns), e.g. ["move", 120, 340, 1500000]
+MACRO_JSON_FORMAT = 'macro-json'
+MACRO_JSON_EXTENSION = '.json'
+
+def export_json(path, actions):
+    actions = EventBuffer.from_actions(actions)
+    events = []
+    for action, timestamp_ns in zip(actions, actions.timestamps):
+        events.append([*action[:-1], timestamp_ns])
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'format': MACRO_JSON_FORMAT, 'version': MACRO_FILE_VERSION, 'events': events}, f)
+    logging.info(f"Exported {len(actions)} actions to {path}")
+
+def import_json(path):
+    with open(path, encoding='utf-8') as f:
+        document = json.load(f)
+    if not isinstance(document, dict) or document.get('format') != MACRO_JSON_FORMAT:
+        raise ValueError(f"Not a macro JSON file: {path}")
+    actions = EventBuffer()
+    for event in document['events']:
+        actions.append((*event[:-1], 0.0), int(event[-1]))
+    logging.info(f"Imported {len(actions)} actions from {path}")
+    return actions
+
+def load_macro(path, use_mmap=True):
+    # Fixed-width files are memory-mapped unless use_mmap is False; packed
+    # files are always decoded into memory
+    with open(path, 'rb') as f:
+        header = f.read(MACRO_HEADER.size)
+    if len(header) == MACRO_HEADER.size and MACRO_HEADER.unpack(header)[1] == MACRO_PACKED_VERSION:
+        actions = load_packed_macro(path)
+    else:
+        actions = MappedEventBuffer(path)
+        if not use_mmap:
+            mapped, actions = actions, actions.copy()
+            mapped.close()
+    logging.info(f"Loaded {len(actions)} actions from {path}")
+    return actions
+
+# Packings for version 2 files, by their header flags value: plain varints, or
+# varints with each column block compressed by zlib or lzma
+MACRO_PACKINGS = {'varint': 0, 'zlib': 1, 'lzma': 2}
+MACRO_BLOCK = struct.Struct('<I')
+ZIGZAG_BYTES = tuple((value >> 1) ^ -(value & 1) for value in range(0x80))  # Decoded single-byte varints
+
+def encode_varints(column):
+    encoded = bytearray()
+    previous = 0
+    for value in column:
+        delta = value - previous
+        previous = value
+        delta = delta << 1 if delta >= 0 else (~delta << 1) | 1
+        while delta > 0x7f:
+            encoded.append(delta & 0x7f | 0x80)
+            delta >>= 7
+        encoded.append(delta)
+    return bytes(encoded)
+
+def decode_varints(data, typecode):
+    if not data or max(data) < 0x80:
+        # Every delta fits in one byte (typical of mouse coordinates): the
+        # lookup, the running sum and the array are all done in C
+        return array(typecode, accumulate(map(ZIGZAG_BYTES.__getitem__, data)))
+    deltas = []
+    append = deltas.append
+    value = shift = 0
+    for byte in data:
+        if byte < 0x80:
+            value |= byte << shift
+            append((value >> 1) ^ -(value & 1))
+            value = shift = 0
+        else:
+            value |= (byte & 0x7f) << shift
+            shift += 7
+    return array(typecode, accumulate(deltas))
+
+def compress_block(data, packing):
+    if packing == 'zlib':
+        return zlib.compress(data)
+    if packing == 'lzma':
+        import lzma  # Optional in some Python builds
+        return lzma.compress(data)
+    return data
+
+def decompress_block(data, flags):
+    if flags == MACRO_PACKINGS['zlib']:
+        return zlib.decompress(data)
+    if flags == MACRO_PACKINGS['lzma']:
+        import lzma
+        return lzma.decompress(data)
+    return data
+
+def save_packed_macro(path, actions, packing='zlib'):
+    if packing not in MACRO_PACKINGS:
+        raise ValueError(f"Unknown macro packing: {packing}")
+    actions = EventBuffer.from_actions(actions)
+    symbol_table = pack_symbols(actions.symbols)
+    size = MACRO_HEADER.size + len(symbol_table)
+    with replacing(path, actions) as f:
+        f.write(MACRO_HEADER.pack(
+            MACRO_FILE_MAGIC, MACRO_PACKED_VERSION, MACRO_PACKINGS[packing], len(actions.symbols),
+            len(symbol_table), len(actions), actions.duration_ns()
+        ))
+        f.write(symbol_table)
+        for name, typecode in MACRO_COLUMNS:
+            column = getattr(actions, name)
+            data = bytes(column) if typecode == 'B' else encode_varints(column)
+            block = compress_block(data, packing)
+            f.write(MACRO_BLOCK.pack(len(block)))
+            f.write(block)
+            size += MACRO_BLOCK.size + len(block)
+    fixed_size = MACRO_HEADER.size + len(symbol_table) + actions.nbytes()
+    logging.info(f"Saved {len(actions)} actions to {path} ({packing}: {size} bytes, {fixed_size} fixed-width)")
+
+def load_packed_macro(path):
+    with open(path, 'rb') as f:
+        data = memoryview(f.read())
+    if len(data) < MACRO_HEADER.size:
+        raise ValueError(f"Not a macro file: {path}")
+    magic, version, flags, symbol_count, symbols_size, event_count, _ = MACRO_HEADER.unpack_from(data)
+    if magic != MACRO_FILE_MAGIC:
+        raise ValueError(f"Not a macro file: {path}")
+    if version != MACRO_PACKED_VERSION:
+        raise ValueError(f"Unsupported macro file version {version}: {path}")
+    if flags not in MACRO_PACKINGS.values():
+        raise ValueError(f"Unknown macro packing {flags}: {path}")
+    offset = MACRO_HEADER.size
+    if offset + symbols_size > len(data):
+        raise ValueError(f"Truncated macro file: {path}")
+    try:
+        actions = EventBuffer(unpack_symbols(data[offset:offset + symbols_size], symbol_count))
+    except ValueError as e:
+        raise ValueError(f"Corrupt macro file {path}: {e}")
+    offset += symbols_size
+    for name, typecode in MACRO_COLUMNS:
+        if offset + MACRO_BLOCK.size > len(data):
+            raise ValueError(f"Truncated macro file: {path}")
+        (size,) = MACRO_BLOCK.unpack_from(data, offset)
+        offset += MACRO_BLOCK.size
+        if offset + size > len(data):
+            raise ValueError(f"Truncated macro file: {path}")
+        try:
+            block = decompress_block(data[offset:offset + size], flags)
+        except Exception as e:
+            raise ValueError(f"Corrupt macro file {path}: {e}")
+        offset += size
+        column = array(typecode, block) if typecode == 'B' else decode_varints(block, typecode)
+        if len(column) != event_count:
+            raise ValueError(f"Corrupt macro file: {path}")
+        setattr(actions, name, column)
+    return actions
+
+# Append-only recording journal, written while capturing (all integers little-endian):
+#   header   magic, version, flags, wall-clock start (ns since the epoch)
+#   chunks   magic, new symbol count, symbol table size, event count, CRC-32 of
+#            the payload; then the symbols interned since the previous chunk
+#            and the chunk's events column by column, laid out as in a macro file
+# Every chunk is a checkpoint: the capture consumer appends one whenever enough
+# events are pending or JOURNAL_CHECKPOINT_NS has passed, and then drops those
+# events from memory. Chunks are flushed to the OS but never fsync'd, so a
+# crashed recorder loses at most its last checkpoint interval; a torn chunk at
+# the end of the file fails its size or CRC check and is discarded on load.
+JOURNAL_MAGIC = b'MJNL'
+JOURNAL_VERSION = 1
+JOURNAL_EXTENSION = '.journal'
+JOURNAL_HEADER = struct.Struct('<4sHHq')
+JOURNAL_CHUNK_MAGIC = b'CHNK'
+JOURNAL_CHUNK = struct.Struct('<4sIIII')
+JOURNAL_CHUNK_EVENTS = 4096  # Pending events that trigger a checkpoint
+JOURNAL_CHECKPOINT_NS = 1_000_000_000  # Longest time a captured event stays in memory only
+
+class JournalWriter:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, 0, time.time_ns()))
+        self.file.flush()
+        self.symbols_written = 0
+        self.events_written = 0
+        self.duration_ns = 0
+        self.chunks = 0
+
+    def checkpoint(self, events):
+        # Append the buffered events as one chunk, then empty the buffer in place.
+        # Symbols stay interned so later events keep their ids.
+        count = len(events)
+        symbols = events.symbols[self.symbols_written:]
+        if not count and not symbols:
+            return
+        payload = [pack_symbols(symbols)]
+        payload += [column_bytes(getattr(events, name), typecode) for name, typecode in MACRO_COLUMNS]
+        crc = 0
+        for part in payload:
+            crc = zlib.crc32(part, crc)
+        self.file.write(JOURNAL_CHUNK.pack(JOURNAL_CHUNK_MAGIC, len(symbols), len(payload[0]), count, crc))
+        self.file.writelines(payload)
+        self.file.flush()
+        if count:
+            self.duration_ns = events.timestamps[-1]
+        self.symbols_written += len(symbols)
+        self.events_written += count
+        self.chunks += 1
+        for name, _ in MACRO_COLUMNS:
+            del getattr(events, name)[:]
+
+    def close(self, events=None):
+        if self.file is None:
+            return
+        try:
+            if events is not None:
+                self.checkpoint(events)
+        finally:
+            self.file.close()
+            self.file = None
+        logging.info(f"Journal {self.path}: {self.events_written} events in {self.chunks} chunks")
+
+def iter_journal(path, warn=True):
+    # Yields (new_symbols, columns) for every intact chunk, in MACRO_COLUMNS order;
+    # stops quietly at a torn or damaged tail left behind by a crash
+    event_size = sum(struct.calcsize(typecode) for _, typecode in MACRO_COLUMNS)
+    with open(path, 'rb') as f:
+        header = f.read(JOURNAL_HEADER.size)
+        if len(header) < JOURNAL_HEADER.size or header[:4] != JOURNAL_MAGIC:
+            raise ValueError(f"Not a recording journal: {path}")
+        version = JOURNAL_HEADER.unpack(header)[1]
+        if version != JOURNAL_VERSION:
+            raise ValueError(f"Unsupported journal version {version}: {path}")
+        while True:
+            offset = f.tell()
+            raw = f.read(JOURNAL_CHUNK.size)
+            if not raw:
+                return
+            payload = b''
+            if len(raw) == JOURNAL_CHUNK.size:
+                magic, symbol_count, symbols_size, event_count, crc = JOURNAL_CHUNK.unpack(raw)
+                if magic == JOURNAL_CHUNK_MAGIC:
+                    payload_size = symbols_size + event_count * event_size
+                    payload = f.read(payload_size)
+            if not payload or len(payload) < payload_size or zlib.crc32(payload) != crc:
+                if warn:
+                    logging.warning(f"Discarding damaged journal tail at byte {offset}: {path}")
+                return
+            view = memoryview(payload)
+            symbols = unpack_symbols(view[:symbols_size], symbol_count)
+            columns = []
+            position = symbols_size
+            for _, typecode in MACRO_COLUMNS:
+                size = event_count * struct.calcsize(typecode)
+                column = array(typecode)
+                column.frombytes(view[position:position + size])
+                if sys.byteorder != 'little' and column.itemsize > 1:
+                    column.byteswap()
+                columns.append(column)
+                position += size
+            yield symbols, columns
+
+def load_journal(path):
+    # Reads a journal (finished or recovered after a crash) into memory
+    actions = EventBuffer()
+    for symbols, columns in iter_journal(path):
+        for name in symbols:
+            actions.intern(name)
+        for (name, _), column in zip(MACRO_COLUMNS, columns):
+            getattr(actions, name).extend(column)
+    logging.info(f"Loaded {len(actions)} actions from journal {path}")
+    return actions
+
+def compact_journal(journal_path, macro_path):
+    # Rewrites a journal as a macro file one column at a time, so memory use
+    # stays at one chunk however long the recording is. Returns the event count.
+    symbols = []
+    event_count = 0
+    duration_ns = 0
+    for new_symbols, columns in iter_journal(journal_path):
+        symbols += new_symbols
+        event_count += len(columns[0])
+        if columns[0]:
+            duration_ns = columns[0][-1]
+    symbol_table = pack_symbols(symbols)
+    with replacing(macro_path) as f:
+        f.write(MACRO_HEADER.pack(
+            MACRO_FILE_MAGIC, MACRO_FILE_VERSION, 0, len(symbols), len(symbol_table), event_count, duration_ns
+        ))
+        f.write(symbol_table)
+        for index, (_, typecode) in enumerate(MACRO_COLUMNS):
+            for _, columns in iter_journal(journal_path, warn=False):
+                f.write(column_bytes(columns[index], typecode))
+    logging.info(f"Compacted {event_count} actions from {journal_path} to {macro_path}")
+    return event_count
+
+# Mouse-move compression during capture
+MOVE_BUCKET_NS = 4_000_000  # Moves closer together than this coalesce (latest wins); 0 disables
+MOVE_TOLERANCE_PX = 1.0  # Ramer-Douglas-Peucker tolerance in pixels; 0 disables
+MOVE_WINDOW = 256  # Pending points that trigger an incremental simplification pass
+
+class MoveCompressor:
+    # Sits between the recorder callbacks and the EventBuffer. Moves are first
+    # coalesced into time buckets, then the pending path is simplified with
+    # Ramer-Douglas-Peucker whenever another event arrives or the window fills.
+    # Path endpoints are always kept, so the cursor still reaches the exact
+    # position of every click.
+    def __init__(self, events, bucket_ns=MOVE_BUCKET_NS, tolerance_px=MOVE_TOLERANCE_PX, window=MOVE_WINDOW):
+        self.events = events
+        self.bucket_ns = bucket_ns
+        self.tolerance_px = tolerance_px
+        self.window = max(window, 3)
+        self.xs = []
+        self.ys = []
+        self.times = []
+        self.bucket_start_ns = 0
+        self.raw_moves = 0
+        self.kept_moves = 0
+
+    def add_move(self, x, y, timestamp_ns):
+        self.raw_moves += 1
+        if self.times and self.bucket_ns and timestamp_ns - self.bucket_start_ns < self.bucket_ns:
+            self.xs[-1] = x
+            self.ys[-1] = y
+            self.times[-1] = timestamp_ns
+            return
+        self.xs.append(x)
+        self.ys.append(y)
+        self.times.append(timestamp_ns)
+        self.bucket_start_ns = timestamp_ns
+        if len(self.times) >= self.window:
+            # Emit everything but the last kept point, which anchors the next window
+            self.emit(self.simplify(), keep_anchor=True)
+
+    def flush(self):
+        # Called before any non-move event is stored, and when recording stops
+        if self.times:
+            self.emit(self.simplify(), keep_anchor=False)
+
+    def emit(self, kept, keep_anchor):
+        xs, ys, times = self.xs, self.ys, self.times
+        last = kept[-1]
+        for index in (kept[:-1] if keep_anchor else kept):
+            self.events.append_event(EV_MOVE, times[index], xs[index], ys[index])
+        if keep_anchor:
+            self.kept_moves += len(kept) - 1
+            self.xs, self.ys, self.times = [xs[last]], [ys[last]], [times[last]]
+            # The anchor is already a real point; do not coalesce new moves into it
+            self.bucket_start_ns = times[last] - self.bucket_ns
+        else:
+            self.kept_moves += len(kept)
+            self.xs, self.ys, self.times = [], [], []
+
+    def simplify(self):
+        # Iterative Ramer-Douglas-Peucker; returns the indices of kept points in order
+        count = len(self.times)
+        if count < 3 or self.tolerance_px <= 0:
+            return list(range(count))
+        xs, ys = self.xs, self.ys
+        tolerance_sq = self.tolerance_px * self.tolerance_px
+        keep = [False] * count
+        keep[0] = keep[-1] = True
+        stack = [(0, count - 1)]
+        while stack:
+            first, last = stack.pop()
+            ax, ay = xs[first], ys[first]
+            dx, dy = xs[last] - ax, ys[last] - ay
+            length_sq = dx * dx + dy * dy
+            farthest, farthest_sq = -1, tolerance_sq
+            for index in range(first + 1, last):
+                px, py = xs[index] - ax, ys[index] - ay
+                if length_sq:
+                    # Distance to the segment, clamping the projection onto it
+                    t = max(0.0, min(1.0, (px * dx + py * dy) / length_sq))
+                    ex, ey = px - t * dx, py - t * dy
+                    distance_sq = ex * ex + ey * ey
+                else:
+                    distance_sq = px * px + py * py
+                if distance_sq > farthest_sq:
+                    farthest, farthest_sq = index, distance_sq
+            if farthest >= 0:
+                keep[farthest] = True
+                if farthest - first > 1:
+                    stack.append((first, farthest))
+                if last - farthest > 1:
+                    stack.append((farthest, last))
+        return [index for index in range(count) if keep[index]]
+
+def compress_moves(actions, bucket_ns=MOVE_BUCKET_NS, tolerance_px=MOVE_TOLERANCE_PX):
+    # Offline version of the capture-time compression, e.g. for older recordings
+    source = EventBuffer.from_actions(actions)
+    compressed = EventBuffer(source.symbols)
+    compressor = MoveCompressor(compressed, bucket_ns, tolerance_px)
+    types, arg0, arg1, arg2 = source.types, source.arg0, source.arg1, source.arg2
+    for index, timestamp_ns in enumerate(source.timestamps):
+        code = types[index]
+        if code == EV_MOVE:
+            compressor.add_move(arg0[index], arg1[index], timestamp_ns)
+        else:
+            compressor.flush()
+            compressed.append_event(code, timestamp_ns, arg0[index], arg1[index], arg2[index])
+    compressor.flush()
+    return compressed
+
+# Capture pipeline between the input hooks and event processing
+CAPTURE_RING_SIZE = 1 << 16  # Slots per listener ring (a power of two)
+CAPTURE_REORDER_WINDOW_NS = 5_000_000  # Hold events this long so both listeners can catch up
+
+class CaptureRing:
+    # Single-producer/single-consumer ring of preallocated slots. The producer (one
+    # listener thread) only writes the slot at head and then advances head;
+    # the consumer only advances tail, so neither side takes a lock. When the ring
+    # is full the new event is dropped and counted rather than blocking the hook.
+    def __init__(self, capacity=CAPTURE_RING_SIZE, wakeup=None):
+        if capacity <= 0 or capacity & (capacity - 1):
+            raise ValueError(f"Ring capacity must be a power of two, got {capacity}")
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.codes = array('B', bytes(capacity))
+        self.stamps = array('q', bytes(8 * capacity))
+        self.payloads = [None] * capacity
+        self.head = 0  # Events pushed so far (written by the producer only)
+        self.tail = 0  # Events consumed so far (written by the consumer only)
+        self.dropped = 0
+        self.high_water = 0
+        self.wakeup = wakeup or threading.Event()
+
+    def push(self, code, payload, timestamp_ns):
+        head = self.head
+        if head - self.tail >= self.capacity:
+            self.dropped += 1
+            return False
+        slot = head & self.mask
+        self.codes[slot] = code
+        self.stamps[slot] = timestamp_ns
+        self.payloads[slot] = payload
+        self.head = head + 1
+        # Only touch the Event's lock when the consumer may be asleep
+        if not self.wakeup.is_set():
+            self.wakeup.set()
+        return True
+
+    def drain(self, handle):
+        # Consumer side: hand every pending event to handle(code, payload, timestamp_ns)
+        tail, head = self.tail, self.head
+        pending = head - tail
+        if pending > self.high_water:
+            self.high_water = pending
+        codes, stamps, payloads, mask = self.codes, self.stamps, self.payloads, self.mask
+        while tail < head:
+            slot = tail & mask
+            payload = payloads[slot]
+            payloads[slot] = None
+            handle(codes[slot], payload, stamps[slot])
+            tail += 1
+        self.tail = tail
+        return pending
+
+    def __len__(self):
+        return self.head - self.tail
+
+class EventMerger:
+    # Merges the per-listener capture rings into one stream ordered by the
+    # timestamps taken at the source. Each ring is already in order; an event is
+    # released only once it is older than the reorder window, so an event stamped
+    # earlier on the other listener thread but pushed a little later still comes
+    # out first. Anything arriving later than that is counted and clamped so the
+    # output timeline never runs backwards.
+    def __init__(self, rings, handle, window_ns=CAPTURE_REORDER_WINDOW_NS):
+        self.rings = rings
+        self.handle = handle
+        self.window_ns = window_ns
+        self.heap = []
+        self.sequence = 0  # Tie-breaker keeping equal timestamps in arrival order
+        self.last_released_ns = 0
+        self.late = 0
+
+    def collect(self, code, payload, timestamp_ns):
+        heapq.heappush(self.heap, (timestamp_ns, self.sequence, code, payload))
+        self.sequence += 1
+
+    def poll(self, flush=False):
+        # Release everything outside the window (or everything when flushing) and
+        # return the seconds until the next held event becomes releasable
+        for ring in self.rings:
+            ring.drain(self.collect)
+        heap = self.heap
+        horizon_ns = time.perf_counter_ns() - self.window_ns
+        while heap and (flush or heap[0][0] <= horizon_ns):
+            timestamp_ns, _, code, payload = heapq.heappop(heap)
+            if timestamp_ns < self.last_released_ns:
+                self.late += 1
+                timestamp_ns = self.last_released_ns
+            self.last_released_ns = timestamp_ns
+            self.handle(code, payload, timestamp_ns)
+        if not heap:
+            return None
+        return max(heap[0][0] - horizon_ns, 0) / 1e9
+
+class CaptureSession:
+    # Qt-free recording pipeline: the backend's listeners push raw events into one
+    # capture ring each, and a consumer thread merges them by timestamp,
+    # normalizes and compresses them and stores them in an EventBuffer.
+    # start() returns immediately; stop() flushes everything and returns once
+    # the last event has been stored.
+    #
+    # With a journal_path the session streams instead: stored events are
+    # checkpointed to an append-only journal and dropped from memory, so
+    # actions only ever holds the events since the last checkpoint.
+    #
+    # backend is an InputBackend (or its name) providing the listeners; pynput
+    # by default.
+    def __init__(self, move_bucket_ns=MOVE_BUCKET_NS, move_tolerance_px=MOVE_TOLERANCE_PX,
+                 ring_size=CAPTURE_RING_SIZE, reorder_window_ns=CAPTURE_REORDER_WINDOW_NS,
+                 journal_path=None, checkpoint_events=JOURNAL_CHUNK_EVENTS, checkpoint_ns=JOURNAL_CHECKPOINT_NS,
+                 backend=None):
+        self.backend = get_backend(backend)
+        self.recording = False
+        self.actions = EventBuffer()  # Timestamps are absolute offsets (ns) from start_time_ns
+        self.journal_path = journal_path
+        self.journal = None
+        self.journal_failed = False  # A write failed; later events stayed in actions
+        self.checkpoint_events = checkpoint_events
+        self.checkpoint_ns = checkpoint_ns
+        self.next_checkpoint_ns = 0
+        self.move_compressor = MoveCompressor(self.actions, move_bucket_ns, move_tolerance_px)
+        self.start_time = None  # Wall-clock start, for display only
+        self.start_time_ns = None  # Monotonic start (perf_counter_ns)
+        self.last_offset_ns = 0  # Offset of the last action, used to derive logged deltas
+        self.keyboard_listener = None
+        self.mouse_listener = None
+        # The hooks only push raw events; a consumer thread does everything else
+        self.data_ready = threading.Event()
+        self.keyboard_ring = CaptureRing(ring_size, self.data_ready)
+        self.mouse_ring = CaptureRing(ring_size, self.data_ready)
+        self.merger = EventMerger((self.keyboard_ring, self.mouse_ring), self.process_event, reorder_window_ns)
+        self.consumer_thread = None
+        self.consumer_stopping = False
+
+    def start(self):
+        self.start_time = time.time()
+        self.start_time_ns = time.perf_counter_ns()
+        self.last_offset_ns = 0
+        if self.journal_path is not None:
+            self.journal = JournalWriter(self.journal_path)
+            self.journal_failed = False
+            self.next_checkpoint_ns = self.start_time_ns + self.checkpoint_ns
+        self.consumer_thread = threading.Thread(target=self.consume_events, name='capture-consumer', daemon=True)
+        self.consumer_thread.start()
+        self.recording = True
+        try:
+            self.keyboard_listener = self.backend.keyboard_listener(self.on_key_press, self.on_key_release)
+            self.mouse_listener = self.backend.mouse_listener(
+                self.on_mouse_move, self.on_mouse_click, self.on_mouse_scroll
+            )
+            self.keyboard_listener.start()
+            self.mouse_listener.start()
+        except Exception:
+            self.stop()
+            raise
+        logging.info(f"Capture Started ({self.backend.name} backend)")
+
+    def stop(self):
+        self.recording = False
+        for listener in (self.keyboard_listener, self.mouse_listener):
+            if listener is not None:
+                listener.stop()
+        self.keyboard_listener = None
+        self.mouse_listener = None
+        if self.consumer_thread is None:
+            return
+        self.stop_consumer()
+        logging.info(
+            f"Capture rings: {self.dropped_events()} events dropped, {self.merger.late} arrived outside the "
+            f"reorder window, high-water mark {self.keyboard_ring.high_water} keyboard / "
+            f"{self.mouse_ring.high_water} mouse"
+        )
+        logging.info(
+            f"Mouse moves: {self.move_compressor.raw_moves} captured, "
+            f"{self.move_compressor.kept_moves} kept after compression"
+        )
+
+    def dropped_events(self):
+        return self.keyboard_ring.dropped + self.mouse_ring.dropped
+
+    def recorded_events(self):
+        # Includes events already checkpointed to the journal
+        return len(self.actions) + (self.journal.events_written if self.journal is not None else 0)
+
+    def journal_complete(self):
+        # True once a streamed recording is entirely in its journal
+        return self.journal is not None and not self.journal_failed and not self.actions
+
+    def recorded_actions(self):
+        # The whole recording after stop(): the journal's events followed by
+        # any kept in memory after a journal write failed. Symbols are interned
+        # in order, so the journal's table is a prefix of the in-memory one.
+        if self.journal is None or not self.journal.events_written:
+            return self.actions
+        actions = EventBuffer(self.actions.symbols)
+        journaled = load_journal(self.journal_path)
+        for name, _ in MACRO_COLUMNS:
+            column = getattr(actions, name)
+            column.extend(getattr(journaled, name))
+            column.extend(getattr(self.actions, name))
+        return actions
+
+    # Listener callbacks: run on the backend's hook threads, so they only
+    # timestamp the event and push the raw payload into that listener's ring
+
+    def on_key_press(self, key):
+        if self.recording:
+            self.keyboard_ring.push(EV_KEY_DOWN, key, time.perf_counter_ns())
+
+    def on_key_release(self, key):
+        if self.recording:
+            self.keyboard_ring.push(EV_KEY_UP, key, time.perf_counter_ns())
+
+    def on_mouse_move(self, x, y):
+        if self.recording:
+            self.mouse_ring.push(EV_MOVE, (x, y), time.perf_counter_ns())
+
+    def on_mouse_click(self, x, y, button, pressed):
+        if self.recording:
+            self.mouse_ring.push(EV_MOUSE_DOWN if pressed else EV_MOUSE_UP, (button, x, y), time.perf_counter_ns())
+
+    def on_mouse_scroll(self, x, y, dx, dy):
+        if self.recording:
+            self.mouse_ring.push(EV_SCROLL, (x, y, dx, dy), time.perf_counter_ns())
+
+    # Consumer side: normalization, compression, storage and logging
+
+    def consume_events(self):
+        # Only wakes up with a timeout while the merger is holding events back
+        timeout = None
+        while True:
+            self.data_ready.wait(timeout)
+            self.data_ready.clear()
+            stopping = self.consumer_stopping
+            timeout = self.merger.poll(flush=stopping)
+            if stopping:
+                break
+            if self.journal is not None and not self.journal_failed and self.actions:
+                timeout = self.checkpoint(timeout)
+        self.move_compressor.flush()
+        if self.journal is not None and not self.journal_failed:
+            try:
+                self.journal.close(self.actions)
+            except OSError as e:
+                self.journal_failed = True
+                logging.error(f"Journal write failed, keeping the last events in memory: {e}")
+
+    def checkpoint(self, timeout):
+        # Writes a journal chunk when one is due; returns the consumer's next timeout
+        now = time.perf_counter_ns()
+        if len(self.actions) < self.checkpoint_events and now < self.next_checkpoint_ns:
+            remaining = (self.next_checkpoint_ns - now) / 1e9
+            return remaining if timeout is None else min(timeout, remaining)
+        try:
+            self.journal.checkpoint(self.actions)
+        except OSError as e:
+            # Keep recording in memory rather than losing events
+            # The writer is kept for its counts; nothing more is written to it
+            logging.error(f"Journal write failed, recording continues in memory: {e}")
+            self.journal_failed = True
+            try:
+                self.journal.close()
+            except OSError:
+                pass
+        self.next_checkpoint_ns = now + self.checkpoint_ns
+        return timeout
+
+    def stop_consumer(self):
+        if self.consumer_thread is None:
+            return
+        self.consumer_stopping = True
+        self.data_ready.set()
+        self.consumer_thread.join()
+        self.consumer_thread = None
+
+    def process_event(self, code, payload, timestamp_ns):
+        offset_ns = timestamp_ns - self.start_time_ns
+        delta = (offset_ns - self.last_offset_ns) / 1e9
+        self.last_offset_ns = offset_ns
+        if code == EV_MOVE:
+            x, y = payload
+            self.move_compressor.add_move(int(x), int(y), offset_ns)
+            logging.debug("Mouse Moved to (%s, %s) | Delta Time: %s", x, y, delta)
+            return
+        self.move_compressor.flush()
+        if code == EV_KEY_DOWN or code == EV_KEY_UP:
+            key_name = self.backend.key_name(payload)
+            self.actions.append_event(code, offset_ns, self.actions.intern(key_name))
+            logging.debug("Key %s: %s | Delta Time: %s", 'Pressed' if code == EV_KEY_DOWN else 'Released', key_name, delta)
+        elif code == EV_MOUSE_DOWN or code == EV_MOUSE_UP:
+            button, x, y = payload
+            button_name = self.backend.button_name(button)
+            self.actions.append_event(code, offset_ns, self.actions.intern(button_name), int(x), int(y))
+            logging.debug("Mouse %s: %s at (%s, %s) | Delta Time: %s", 'Pressed' if code == EV_MOUSE_DOWN else 'Released', button_name, x, y, delta)
+        elif code == EV_SCROLL:
+            x, y, dx, dy = payload
+            self.actions.append_event(EV_SCROLL, offset_ns, int(dx), int(dy))
+            logging.debug("Mouse Scrolled: dx=%s, dy=%s at (%s, %s) | Delta Time: %s", dx, dy, x, y, delta)
+
+PROGRESS_RATE_HZ = 20  # Upper bound on progress callbacks per second
+
+class ProgressThrottle:
+    # Rate limits progress reports: at most rate_hz callbacks per second, and
+    # values reported in between are coalesced so only the latest is delivered.
+    # flush() hands over a value that is still pending, e.g. when playback ends,
+    # and idle() before a long wait, so the value shown during the wait is current.
+    def __init__(self, callback, rate_hz=PROGRESS_RATE_HZ):
+        self.callback = callback
+        self.interval_ns = int(1e9 / rate_hz) if rate_hz else 0
+        self.next_ns = 0
+        self.pending = None
+        self.emitted = 0
+
+    def report(self, done, total):
+        now = time.perf_counter_ns()
+        if now < self.next_ns:
+            self.pending = (done, total)
+            return
+        self.pending = None
+        self.next_ns = now + self.interval_ns
+        self.emitted += 1
+        self.callback(done, total)
+
+    def idle(self, wait_ns):
+        # Waits of at least one interval keep the rate limit even when flushed
+        if self.pending is not None and wait_ns >= self.interval_ns:
+            self.next_ns = time.perf_counter_ns() + self.interval_ns
+            self.flush()
+
+    def flush(self):
+        if self.pending is not None:
+            done, total = self.pending
+            self.pending = None
+            self.emitted += 1
+            self.callback(done, total)
+
+# Actions whose deadlines fall within this window of the first one in a run are
+# injected as one batch (one backend write for uinput), which also keeps chords
+# and click-with-move sequences atomic. Kept under the 1 ms spacing of a 1 kHz
+# mouse stream so recorded paths are not bunched up. None disables batching.
+BATCH_WINDOW_NS = 500_000
+
+OP_SKIP = 0  # Plan opcode of events that are not replayed; the others are their EV_* codes
+
+class PlaybackPlan:
+    # Actions compiled once for replay without per-event objects: a one-byte
+    # opcode per event, key and button objects resolved once per symbol, and the
+    # index of the first event of every step. A step is one wait followed by one
+    # event, or by a batch of near-simultaneous events. Timestamps and arguments
+    # are read straight from the buffer's columns, memory-mapped ones included.
+    def __init__(self, actions, opcodes, starts, keys, buttons, skipped=0, batches=0, batched=0):
+        self.timestamps = actions.timestamps
+        self.arg0 = actions.arg0
+        self.arg1 = actions.arg1
+        self.opcodes = opcodes
+        self.starts = starts  # Step start indices, followed by len(actions)
+        self.keys = keys  # Resolved key per symbol, None where unused or unknown
+        self.buttons = buttons  # Resolved button per symbol, likewise
+        self.duration_ns = actions.duration_ns()  # Length of one iteration
+        self.skipped = skipped  # Actions dropped because their key/button is unknown
+        self.batches = batches  # Steps that inject several actions at once
+        self.batched = batched  # Actions inside those steps
+
+    def __len__(self):
+        return len(self.starts) - 1
+
+    def deadline_ns(self, step):
+        return self.timestamps[self.starts[step]]
+
+class PlaybackSession:
+    # Qt-free playback: compiles the actions into a PlaybackPlan and replays it
+    # repeat_count times on a PlaybackScheduler. run() blocks until playback
+    # ends; status text is reported through on_status, and progress as
+    # on_progress(completed_steps, total_steps) at most progress_rate_hz times
+    # per second. timer picks the scheduler's backend (see TIMER_BACKENDS), and
+    # backend the InputBackend (or its name) to inject into; pynput by default.
+    def __init__(self, actions, repeat_count, timestamps=None, speed=1.0, max_gap_ns=None,
+                 progress_rate_hz=PROGRESS_RATE_HZ, timer='hybrid', backend=None, batch_window_ns=BATCH_WINDOW_NS):
+        # Legacy lists of action tuples are converted once into the columnar store
+        self.actions = EventBuffer.from_actions(actions, timestamps)
+        self.repeat_count = repeat_count
+        self.is_playing = True
+        self.control = PlaybackControl(speed)
+        PlaybackScheduler.check_max_gap(max_gap_ns)
+        self.max_gap_ns = max_gap_ns  # Idle gaps longer than this are shortened to it
+        self.timer = timer
+        self.batch_window_ns = batch_window_ns
+        self.stop_latency_ns = None  # Time from stop_playback() to the loop exiting
+        self.error = None  # Exception that ended the last run, if any
+        self.pressed_keys = set()
+        self.pressed_buttons = set()
+        self.backend = get_backend(backend)
+        self.keyboard_controller = None
+        self.mouse_controller = None
+        self.scheduler = None  # The last run's scheduler, for timing statistics
+        self.on_status = lambda status: None
+        self.on_progress = lambda done, total: None
+        # Looks up on_progress on every call so it can be replaced after construction
+        self.progress = ProgressThrottle(lambda done, total: self.on_progress(done, total), progress_rate_hz)
+
+    def run(self):
+        self.on_status("Playing Macro")
+        logging.info(f"Playback Started ({self.backend.name} backend)")
+        try:
+            keyboard_controller = self.keyboard_controller = self.backend.keyboard_controller()
+            mouse_controller = self.mouse_controller = self.backend.mouse_controller()
+        except Exception as e:
+            # e.g. no display for pynput, or no access to /dev/uinput
+            self.error = e
+            logging.error(f"Playback Error: could not open the {self.backend.name} backend: {e}")
+            self.on_status(f"Playback Error: {e}")
+            return
+
+        try:
+            plan = self.compile_plan(self.actions)
+            steps = len(plan)
+            starts, timestamps = plan.starts, plan.timestamps
+            run_step = self.run_step
+            iteration_ns = plan.duration_ns
+            # Calibrates on first use, before the timeline is anchored
+            spin_threshold_ns = resolve_spin_threshold(self.timer)
+            scheduler = self.scheduler = PlaybackScheduler(
+                self.control, spin_threshold_ns=spin_threshold_ns, max_gap_ns=self.max_gap_ns
+            )
+            wait_until = scheduler.wait_until
+            progress = self.progress
+            report_progress = progress.report
+            total_steps = steps * self.repeat_count
+
+            scheduler.start()
+            for i in range(self.repeat_count):
+                if not self.is_playing:
+                    logging.info("Playback Stopped by User")
+                    break
+                logging.info(f"Starting iteration {i + 1} of {self.repeat_count}")
+                base_ns = i * iteration_ns
+                done = i * steps
+                for step in range(steps):
+                    deadline_ns = base_ns + timestamps[starts[step]]
+                    if progress.pending is not None:
+                        progress.idle(scheduler.target_ns(scheduler.clamp_gap(deadline_ns)) - time.perf_counter_ns())
+                    if not wait_until(deadline_ns):
+                        logging.info("Playback Stopped by User during iteration")
+                        break
+                    run_step(plan, step)
+                    done += 1
+                    report_progress(done, total_steps)
+                drift_ns = scheduler.drift(base_ns + iteration_ns)
+                logging.info(f"Completed iteration {i + 1} of {self.repeat_count} | Cumulative Drift: {drift_ns / 1e6:.3f} ms")
+            logging.info(
+                f"Scheduling lateness: mean {scheduler.mean_lateness_ns() / 1e3:.1f} us, "
+                f"max {scheduler.max_lateness_ns / 1e3:.1f} us over {scheduler.waits} actions"
+            )
+            if self.is_playing:
+                self.on_status("Playback Finished")
+                logging.info("Playback Finished Successfully")
+            else:
+                self.on_status("Playback Stopped")
+        except Exception as e:
+            self.error = e
+            logging.error(f"Playback Error: {e}")
+            self.on_status(f"Playback Error: {e}")
+        finally:
+            self.progress.flush()
+            if self.control.stop_requested_ns is not None:
+                self.stop_latency_ns = time.perf_counter_ns() - self.control.stop_requested_ns
+                logging.info(f"Stop latency: {self.stop_latency_ns / 1e6:.3f} ms")
+            # Release any remaining pressed keys and buttons
+            self.release_all(keyboard_controller, mouse_controller)
+
+    def stop_playback(self):
+        self.is_playing = False
+        self.control.stop()
+
+    def pause_playback(self):
+        self.control.pause()
+
+    def resume_playback(self):
+        self.control.resume()
+
+    def is_paused(self):
+        return self.control.paused
+
+    def set_speed(self, speed):
+        self.control.set_speed(speed)
+
+    def compile_plan(self, actions):
+        # Runs once per playback: unknown type codes, key and button lookups and
+        # step boundaries are all resolved here instead of on every repeat
+        opcodes = array('B', actions.types)
+        symbols = actions.symbols
+        keys = [None] * len(symbols)
+        buttons = [None] * len(symbols)
+        skipped = 0
+        unknown_codes = set(opcodes) - set(EVENT_NAMES)
+        if unknown_codes:
+            logging.warning(f"Unknown action type codes: {sorted(unknown_codes)}")
+        # Resolve every symbol used as a key or button once
+        key_symbols = set()
+        button_symbols = set()
+        for code, symbol in zip(opcodes, actions.arg0):
+            if code == EV_KEY_DOWN or code == EV_KEY_UP:
+                key_symbols.add(symbol)
+            elif code == EV_MOUSE_DOWN or code == EV_MOUSE_UP:
+                button_symbols.add(symbol)
+        for symbol in key_symbols:
+            keys[symbol] = self.get_key(symbols[symbol])
+            if keys[symbol] is None:
+                logging.warning(f"Unrecognized key: {symbols[symbol]}")
+        for symbol in button_symbols:
+            buttons[symbol] = self.get_button(symbols[symbol])
+            if buttons[symbol] is None:
+                logging.warning(f"Unrecognized mouse button: {symbols[symbol]}")
+        unknown_keys = {symbol for symbol in key_symbols if keys[symbol] is None}
+        unknown_buttons = {symbol for symbol in button_symbols if buttons[symbol] is None}
+        if unknown_codes or unknown_keys or unknown_buttons:
+            arg0 = actions.arg0
+            for index, code in enumerate(opcodes):
+                if (code in unknown_codes
+                        or (code == EV_KEY_DOWN or code == EV_KEY_UP) and arg0[index] in unknown_keys
+                        or (code == EV_MOUSE_DOWN or code == EV_MOUSE_UP) and arg0[index] in unknown_buttons):
+                    opcodes[index] = OP_SKIP
+                    skipped += 1
+        starts, batches, batched = self.plan_steps(opcodes, actions.timestamps, self.batch_window_ns)
+        plan = PlaybackPlan(actions, opcodes, starts, keys, buttons, skipped, batches, batched)
+        logging.info(
+            f"Compiled playback plan: {len(plan)} steps, {skipped} skipped, "
+            f"{batched} actions in {batches} batches"
+        )
+        return plan
+
+    @staticmethod
+    def plan_steps(opcodes, timestamps, window_ns):
+        # Every replayed event starts a step, unless its deadline is within
+        # window_ns of the first one of the current step; then it joins that
+        # step's batch. Skipped events ride along as no-ops.
+        count = len(opcodes)
+        if window_ns is None and OP_SKIP not in opcodes:
+            return array('I', range(count + 1)), 0, 0
+        starts = array('I')
+        batches = batched = 0
+        step_ns = 0
+        size = 0  # Replayed events in the current step
+        for index, code in enumerate(opcodes):
+            if code == OP_SKIP:
+                continue
+            timestamp_ns = timestamps[index]
+            if size and window_ns is not None and timestamp_ns - step_ns <= window_ns:
+                size += 1
+                continue
+            if size > 1:
+                batches += 1
+                batched += size
+            starts.append(index)
+            step_ns = timestamp_ns
+            size = 1
+        if size > 1:
+            batches += 1
+            batched += size
+        starts.append(count)
+        return starts, batches, batched
+
+    def run_step(self, plan, step):
+        start, end = plan.starts[step], plan.starts[step + 1]
+        if end - start == 1:
+            self.execute(plan, start)
+            return
+        with self.backend.batch():
+            for index in range(start, end):
+                self.execute(plan, index)
+
+    def execute(self, plan, index):
+        code = plan.opcodes[index]
+        if code == EV_MOVE:
+            self.mouse_controller.position = (plan.arg0[index], plan.arg1[index])
+        elif code == EV_KEY_DOWN:
+            self.press_key(plan.keys[plan.arg0[index]])
+        elif code == EV_KEY_UP:
+            self.release_key(plan.keys[plan.arg0[index]])
+        elif code == EV_MOUSE_DOWN:
+            self.press_button(plan.buttons[plan.arg0[index]])
+        elif code == EV_MOUSE_UP:
+            self.release_button(plan.buttons[plan.arg0[index]])
+        elif code == EV_SCROLL:
+            self.mouse_controller.scroll(plan.arg0[index], plan.arg1[index])
+
+    def press_key(self, key):
+        self.keyboard_controller.press(key)
+        self.pressed_keys.add(key)
+
+    def release_key(self, key):
+        self.keyboard_controller.release(key)
+        self.pressed_keys.discard(key)
+
+    def press_button(self, button):
+        self.mouse_controller.press(button)
+        self.pressed_buttons.add(button)
+
+    def release_button(self, button):
+        self.mouse_controller.release(button)
+        self.pressed_buttons.discard(button)
+
+    def release_all(self, keyboard_controller, mouse_controller):
+        logging.info("Releasing all pressed keys and mouse buttons")
+        for key in list(self.pressed_keys):
+            keyboard_controller.release(key)
+            logging.debug("Released Key: %s", key)
+        for button in list(self.pressed_buttons):
+            mouse_controller.release(button)
+            logging.debug("Released Mouse Button: %s", button)
+        self.pressed_keys.clear()
+        self.pressed_buttons.clear()
+
+    def get_key(self, key_name):
+        return self.backend.key(key_name)
+
+    def get_button(self, button_name):
+        return self.backend.button(button_name)
+
+class Engine:
+    # Base for the Qt-free engines: the work runs on a plain daemon thread and is
+    # reported through observer callbacks. Callbacks are invoked on the engine
+    # thread; GUI adapters have to marshal them to their own thread.
+    #
+    #   'status'    callback(text)
+    #   'progress'  callback(completed_steps, total_steps), rate limited
+    #   'finished'  callback()
+    thread_name = 'engine'
+
+    def __init__(self):
+        self.thread = None
+        self.observers = {'status': [], 'progress': [], 'finished': []}
+
+    def subscribe(self, kind, callback):
+        self.observers[kind].append(callback)
+        return callback
+
+    def unsubscribe(self, kind, callback):
+        self.observers[kind].remove(callback)
+
+    def notify(self, kind, *args):
+        for callback in self.observers[kind]:
+            try:
+                callback(*args)
+            except Exception as e:
+                logging.error(f"{self.thread_name} {kind} observer failed: {e}")
+
+    def start(self):
+        if self.is_running():
+            raise RuntimeError(f"{self.thread_name} is already running")
+        self.thread = threading.Thread(target=self.main, name=self.thread_name, daemon=True)
+        self.thread.start()
+
+    def main(self):
+        try:
+            self.run()
+        finally:
+            self.notify('finished')
+
+    def run(self):
+        raise NotImplementedError
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def wait(self, timeout=None):
+        # Returns True once the engine thread has finished
+        if self.thread is not None:
+            self.thread.join(timeout)
+        return not self.is_running()
+
+class MacroRecorder(Engine):
+    # Recording engine: a CaptureSession that runs until stop() is called
+    thread_name = 'macro-recorder'
+
+    def __init__(self, **options):
+        super().__init__()
+        self.session = CaptureSession(**options)
+        self.stop_event = threading.Event()
+        self.error = None  # Exception that ended the last recording, if any
+
+    @property
+    def actions(self):
+        return self.session.actions
+
+    def run(self):
+        self.notify('status', "Recording Started")
+        logging.info("Recording Started")
+        self.error = None
+        try:
+            self.session.start()
+            # Block until stop() without waking up while idle
+            self.stop_event.wait()
+        except Exception as e:
+            self.error = e
+            logging.error(f"Recording Error: {e}")
+            self.notify('status', f"Recording Error: {e}")
+        finally:
+            self.session.stop()
+            self.notify('status', "Recording Finished")
+            logging.info("Recording Finished")
+
+    def stop(self):
+        self.session.recording = False
+        self.stop_event.set()
+
+class MacroPlayer(Engine):
+    # Playback engine: a PlaybackSession run on the engine thread
+    thread_name = 'macro-player'
+
+    def __init__(self, actions, repeat_count, speed=1.0, max_gap_ns=None, progress_rate_hz=PROGRESS_RATE_HZ,
+                 timer='hybrid', backend=None, batch_window_ns=BATCH_WINDOW_NS):
+        super().__init__()
+        self.session = PlaybackSession(
+            actions, repeat_count, speed=speed, max_gap_ns=max_gap_ns,
+            progress_rate_hz=progress_rate_hz, timer=timer, backend=backend, batch_window_ns=batch_window_ns
+        )
+        self.session.on_status = lambda status: self.notify('status', status)
+        self.session.on_progress = lambda done, total: self.notify('progress', done, total)
+
+    def run(self):
+        self.session.run()
+
+    def stop_playback(self):
+        self.session.stop_playback()
+
+    def pause_playback(self):
+        self.session.pause_playback()
+
+    def resume_playback(self):
+        self.session.resume_playback()
+
+    def is_paused(self):
+        return self.session.is_paused()
+
+    def set_speed(self, speed):
+        self.session.set_speed(speed)
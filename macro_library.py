@@ -0,0 +1,198 @@
+import os
+import time
+import sqlite3
+import logging
+from collections import Counter
+from macro_core import (
+    EventBuffer, save_macro, load_macro, MACRO_FILE_EXTENSION,
+    EV_KEY_DOWN, EV_MOVE, EV_MOUSE_DOWN, EV_SCROLL
+)
+
+# Local macro library: one SQLite index of every saved macro's metadata, with
+# each payload kept as a macro file in a directory next to the database.
+# Listing, searching and tagging only read the index, so browsing thousands of
+# recordings never opens a payload; open() then memory-maps the one file picked.
+#
+#   macros   name, created (ns since the epoch), duration, event counts by kind,
+#            payload file name
+#   tags     (macro, tag) pairs
+#   keys     key-press histogram per macro, (macro, key, presses)
+
+LIBRARY_PATH = 'macro_library.db'
+
+LIBRARY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS macros (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    created_ns INTEGER NOT NULL,
+    duration_ns INTEGER NOT NULL,
+    events INTEGER NOT NULL,
+    key_presses INTEGER NOT NULL,
+    moves INTEGER NOT NULL,
+    clicks INTEGER NOT NULL,
+    scrolls INTEGER NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS macros_created ON macros (created_ns);
+CREATE TABLE IF NOT EXISTS tags (
+    macro_id INTEGER NOT NULL REFERENCES macros (id) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (macro_id, tag)
+);
+CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag);
+CREATE TABLE IF NOT EXISTS keys (
+    macro_id INTEGER NOT NULL REFERENCES macros (id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    presses INTEGER NOT NULL,
+    PRIMARY KEY (macro_id, key)
+);
+CREATE INDEX IF NOT EXISTS keys_key ON keys (key);
+"""
+
+ENTRY_COLUMNS = ('id', 'name', 'created_ns', 'duration_ns', 'events', 'key_presses', 'moves', 'clicks', 'scrolls')
+TAG_SEPARATOR = '\x1f'  # Joins a macro's tags into one column of its index row
+
+def summarize(actions):
+    # Event counts by kind and the key-press histogram, for the index
+    counts = Counter(actions.types)
+    keys = Counter(actions.symbols[symbol] for code, symbol in zip(actions.types, actions.arg0) if code == EV_KEY_DOWN)
+    return {
+        'duration_ns': actions.duration_ns(),
+        'events': len(actions),
+        'key_presses': counts[EV_KEY_DOWN],
+        'moves': counts[EV_MOVE],
+        'clicks': counts[EV_MOUSE_DOWN],
+        'scrolls': counts[EV_SCROLL],
+    }, keys
+
+class MacroLibrary:
+    def __init__(self, path=LIBRARY_PATH):
+        self.path = path
+        self.payload_dir = os.path.splitext(path)[0] + '.macros'
+        try:
+            self.db = sqlite3.connect(path)
+            self.db.execute('PRAGMA foreign_keys = ON')
+            self.db.executescript(LIBRARY_SCHEMA)
+        except sqlite3.DatabaseError as e:
+            raise ValueError(f"Not a macro library {path}: {e}")
+        os.makedirs(self.payload_dir, exist_ok=True)
+
+    def add(self, name, actions, tags=(), packing=None):
+        # Stores a copy of actions under a new, unique name; returns its id.
+        # packing writes the payload in the packed format (see save_macro).
+        actions = EventBuffer.from_actions(actions)
+        info, keys = summarize(actions)
+        with self.db:
+            try:
+                cursor = self.db.execute(
+                    'INSERT INTO macros (name, created_ns, duration_ns, events, key_presses, moves, clicks, scrolls, payload) '
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, '')",
+                    (name, time.time_ns(), info['duration_ns'], info['events'], info['key_presses'],
+                     info['moves'], info['clicks'], info['scrolls'])
+                )
+            except sqlite3.IntegrityError:
+                raise ValueError(f"A macro named {name!r} is already in the library")
+            macro_id = cursor.lastrowid
+            payload = f"{macro_id}{MACRO_FILE_EXTENSION}"
+            self.db.execute('UPDATE macros SET payload = ? WHERE id = ?', (payload, macro_id))
+            self.db.executemany('INSERT INTO keys VALUES (?, ?, ?)', [(macro_id, key, presses) for key, presses in keys.items()])
+            self.db.executemany('INSERT OR IGNORE INTO tags VALUES (?, ?)', [(macro_id, tag) for tag in tags])
+            # Written inside the transaction, so a failed write leaves no index row behind
+            save_macro(os.path.join(self.payload_dir, payload), actions, packing)
+        logging.info(f"Added macro {name!r} to library {self.path} as #{macro_id}")
+        return macro_id
+
+    def entries(self, search=None, tag=None, key=None, limit=None, macro_id=None):
+        # Index rows as dicts, newest first; search matches part of the name,
+        # tag and key must match exactly
+        # Tags come back joined in the same row, so no second query has to list
+        # every id (which would hit SQLite's limit on bound variables)
+        query = (
+            f"SELECT {', '.join(ENTRY_COLUMNS)}, "
+            "(SELECT group_concat(tag, ?) FROM tags WHERE macro_id = macros.id) FROM macros"
+        )
+        conditions, parameters = [], [TAG_SEPARATOR]
+        if macro_id is not None:
+            conditions.append('id = ?')
+            parameters.append(macro_id)
+        if search:
+            conditions.append("name LIKE ? ESCAPE '\\'")
+            escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            parameters.append(f"%{escaped}%")
+        if tag:
+            conditions.append('id IN (SELECT macro_id FROM tags WHERE tag = ?)')
+            parameters.append(tag)
+        if key:
+            conditions.append('id IN (SELECT macro_id FROM keys WHERE key = ?)')
+            parameters.append(key)
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY created_ns DESC, id DESC'
+        if limit:
+            query += ' LIMIT ?'
+            parameters.append(limit)
+        entries = []
+        for row in self.db.execute(query, parameters):
+            entry = dict(zip(ENTRY_COLUMNS, row))
+            entry['tags'] = sorted(row[-1].split(TAG_SEPARATOR)) if row[-1] else []
+            entries.append(entry)
+        return entries
+
+    def find(self, reference):
+        # Looks a macro up by name, or by id given as an int or a '#12' string
+        if isinstance(reference, int) or (reference.startswith('#') and reference[1:].isdigit()):
+            macro_id = reference if isinstance(reference, int) else int(reference[1:])
+            row = self.db.execute('SELECT id FROM macros WHERE id = ?', (macro_id,)).fetchone()
+        else:
+            row = self.db.execute('SELECT id FROM macros WHERE name = ?', (reference,)).fetchone()
+        if row is None:
+            raise ValueError(f"No macro {reference!r} in the library")
+        return row[0]
+
+    def entry(self, reference):
+        return self.entries(macro_id=self.find(reference))[0]
+
+    def key_histogram(self, reference):
+        macro_id = self.find(reference)
+        return self.db.execute(
+            'SELECT key, presses FROM keys WHERE macro_id = ? ORDER BY presses DESC, key', (macro_id,)
+        ).fetchall()
+
+    def open(self, reference, use_mmap=True):
+        macro_id = self.find(reference)
+        (payload,) = self.db.execute('SELECT payload FROM macros WHERE id = ?', (macro_id,)).fetchone()
+        return load_macro(os.path.join(self.payload_dir, payload), use_mmap)
+
+    def tag(self, reference, tags, remove=False):
+        macro_id = self.find(reference)
+        with self.db:
+            if remove:
+                self.db.executemany('DELETE FROM tags WHERE macro_id = ? AND tag = ?', [(macro_id, tag) for tag in tags])
+            else:
+                self.db.executemany('INSERT OR IGNORE INTO tags VALUES (?, ?)', [(macro_id, tag) for tag in tags])
+
+    def rename(self, reference, name):
+        macro_id = self.find(reference)
+        try:
+            with self.db:
+                self.db.execute('UPDATE macros SET name = ? WHERE id = ?', (name, macro_id))
+        except sqlite3.IntegrityError:
+            raise ValueError(f"A macro named {name!r} is already in the library")
+
+    def remove(self, reference):
+        macro_id = self.find(reference)
+        (payload,) = self.db.execute('SELECT payload FROM macros WHERE id = ?', (macro_id,)).fetchone()
+        with self.db:
+            self.db.execute('DELETE FROM macros WHERE id = ?', (macro_id,))
+        try:
+            os.remove(os.path.join(self.payload_dir, payload))
+        except OSError as e:
+            # e.g. still memory-mapped on Windows; the index entry is gone either way
+            logging.warning(f"Could not delete macro payload {payload}: {e}")
+        logging.info(f"Removed macro #{macro_id} from library {self.path}")
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM macros').fetchone()[0]
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from macro_core import (
+    EventBuffer, JournalWriter, load_journal, compact_journal, load_macro,
+    JOURNAL_CHUNK, EV_KEY_DOWN, EV_KEY_UP, EV_MOVE
+)
+
+def typed(actions, text, start_ns):
+    # Appends a key down/up pair per character, 10 ms apart
+    for i, char in enumerate(text):
+        symbol = actions.intern(char)
+        actions.append_event(EV_KEY_DOWN, start_ns + i * 10_000_000, symbol)
+        actions.append_event(EV_KEY_UP, start_ns + i * 10_000_000 + 5_000_000, symbol)
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'recording.journal')
+
+    def write_chunks(self):
+        # Three chunks; the later ones intern new symbols and reuse old ones.
+        # Returns what each chunk held, in order.
+        writer = JournalWriter(self.path)
+        pending = EventBuffer()
+        expected = []
+        for text, start_ns in (('hello', 0), ('world', 100_000_000), ('wow', 200_000_000)):
+            typed(pending, text, start_ns)
+            pending.append_event(EV_MOVE, start_ns + 90_000_000, start_ns // 1_000_000, -7)
+            expected.append(list(pending))
+            writer.checkpoint(pending)
+            self.assertEqual(len(pending), 0)
+        writer.close()
+        self.assertEqual(writer.chunks, 3)
+        return expected
+
+    def test_round_trip(self):
+        chunks = self.write_chunks()
+        actions = load_journal(self.path)
+        self.assertEqual(len(actions), sum(map(len, chunks)))
+        self.assertEqual([action[:-1] for action in actions], [action[:-1] for chunk in chunks for action in chunk])
+        self.assertEqual(list(actions.timestamps), sorted(actions.timestamps))
+
+    def test_torn_tail_is_dropped(self):
+        chunks = self.write_chunks()
+        size = os.path.getsize(self.path)
+        kept = len(chunks[0]) + len(chunks[1])
+        # Cut inside the last chunk's header, then inside its payload
+        for cut in (JOURNAL_CHUNK.size // 2, 3):
+            with self.subTest(cut=cut):
+                with open(self.path, 'r+b') as f:
+                    f.truncate(size - cut)
+                self.assertEqual(len(load_journal(self.path)), kept)
+
+    def test_corrupt_tail_is_dropped(self):
+        chunks = self.write_chunks()
+        with open(self.path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes([last[0] ^ 0xFF]))
+        actions = load_journal(self.path)
+        self.assertEqual(len(actions), len(chunks[0]) + len(chunks[1]))
+
+    def test_compact_matches_load(self):
+        self.write_chunks()
+        with open(self.path, 'ab') as f:
+            f.write(b'CHNK torn')
+        macro_path = os.path.join(self.directory.name, 'recording.macro')
+        count = compact_journal(self.path, macro_path)
+        journaled = load_journal(self.path)
+        compacted = load_macro(macro_path, use_mmap=False)
+        self.assertEqual(count, len(journaled))
+        self.assertEqual(list(compacted), list(journaled))
+        self.assertEqual(compacted.symbols, journaled.symbols)
+
+    def test_not_a_journal(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'MACR')
+        with self.assertRaises(ValueError):
+            load_journal(self.path)
+
+if __name__ == '__main__':
+    unittest.main()
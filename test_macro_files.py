@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+from macro_core import (
+    EventBuffer, MappedEventBuffer, save_macro, load_macro, export_json, import_json,
+    MACRO_PACKINGS, EV_KEY_DOWN, EV_KEY_UP, EV_MOVE, EV_MOUSE_DOWN, EV_MOUSE_UP, EV_SCROLL
+)
+
+def sample_actions():
+    # One of every event kind, with negative and large arguments
+    actions = EventBuffer()
+    shift, a, left = actions.intern('shift'), actions.intern('a'), actions.intern('left')
+    actions.append_event(EV_KEY_DOWN, 0, shift)
+    actions.append_event(EV_KEY_DOWN, 1_500_000, a)
+    actions.append_event(EV_KEY_UP, 40_000_000, a)
+    actions.append_event(EV_KEY_UP, 41_000_000, shift)
+    for i in range(50):
+        actions.append_event(EV_MOVE, 50_000_000 + i * 4_000_000, 100 + i * 7, 2000 - i * 13)
+    actions.append_event(EV_MOUSE_DOWN, 300_000_000, left, 443, 1363)
+    actions.append_event(EV_MOUSE_UP, 380_000_000, left, 443, 1363)
+    actions.append_event(EV_SCROLL, 2_000_000_000, -3, 1)
+    actions.append_event(EV_MOVE, 2_100_000_000, -1920, 3839)
+    return actions
+
+class MacroFileTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.actions = sample_actions()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def assertSameActions(self, actions):
+        self.assertEqual(list(actions), list(self.actions))
+        self.assertEqual(list(actions.timestamps), list(self.actions.timestamps))
+
+    def test_fixed_width_round_trip(self):
+        path = self.path('fixed.macro')
+        save_macro(path, self.actions)
+        mapped = load_macro(path)
+        try:
+            self.assertIsInstance(mapped, MappedEventBuffer)
+            self.assertSameActions(mapped)
+        finally:
+            mapped.close()
+        self.assertSameActions(load_macro(path, use_mmap=False))
+
+    def test_packed_round_trip(self):
+        for packing in MACRO_PACKINGS:
+            with self.subTest(packing=packing):
+                path = self.path(f'{packing}.macro')
+                save_macro(path, self.actions, packing)
+                self.assertSameActions(load_macro(path))
+
+    def test_json_round_trip(self):
+        path = self.path('macro.json')
+        export_json(path, self.actions)
+        self.assertSameActions(import_json(path))
+
+    def test_empty_round_trip(self):
+        for packing in (None, *MACRO_PACKINGS):
+            with self.subTest(packing=packing):
+                path = self.path(f'empty-{packing}.macro')
+                save_macro(path, EventBuffer(), packing)
+                self.assertEqual(len(load_macro(path, use_mmap=False)), 0)
+
+    def test_save_over_mapped_source(self):
+        path = self.path('same.macro')
+        save_macro(path, self.actions)
+        mapped = load_macro(path)
+        try:
+            save_macro(path, mapped)
+            self.assertSameActions(mapped)
+        finally:
+            mapped.close()
+        self.assertSameActions(load_macro(path, use_mmap=False))
+
+    def test_truncated_files_raise_value_error(self):
+        for packing in (None, *MACRO_PACKINGS):
+            path = self.path(f'full-{packing}.macro')
+            save_macro(path, self.actions, packing)
+            with open(path, 'rb') as f:
+                data = f.read()
+            cut_path = self.path('cut.macro')
+            for size in range(len(data)):
+                with self.subTest(packing=packing, size=size):
+                    with open(cut_path, 'wb') as f:
+                        f.write(data[:size])
+                    with self.assertRaises(ValueError):
+                        load_macro(cut_path, use_mmap=False)
+
+if __name__ == '__main__':
+    unittest.main()
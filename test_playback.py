@@ -0,0 +1,130 @@
+import time
+import threading
+import unittest
+from macro_backends import FakeBackend
+from macro_core import (
+    EventBuffer, PlaybackSession, PlaybackScheduler,
+    EV_KEY_DOWN, EV_KEY_UP, EV_MOVE, EV_MOUSE_DOWN, EV_MOUSE_UP, EV_SCROLL
+)
+
+MS = 1_000_000
+
+def keystrokes(count, interval_ns):
+    # count presses of 'a', each released half an interval later
+    actions = EventBuffer()
+    a = actions.intern('a')
+    for i in range(count):
+        actions.append_event(EV_KEY_DOWN, i * interval_ns, a)
+        actions.append_event(EV_KEY_UP, i * interval_ns + interval_ns // 2, a)
+    return actions
+
+class PlaybackTest(unittest.TestCase):
+    def play(self, actions, repeat_count=1, **options):
+        # Runs a session on the fake backend; returns it, the backend and the wall time
+        backend = FakeBackend()
+        session = PlaybackSession(actions, repeat_count, timer='sleep', backend=backend, **options)
+        start_ns = time.perf_counter_ns()
+        session.run()
+        self.assertIsNone(session.error)
+        return session, backend, time.perf_counter_ns() - start_ns
+
+    def start(self, actions, **options):
+        # Runs a session on a thread, for tests that steer it while it plays
+        backend = FakeBackend()
+        session = PlaybackSession(actions, 1, timer='sleep', backend=backend, **options)
+        thread = threading.Thread(target=session.run)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(session.stop_playback)
+        return session, backend, thread
+
+    def wait_for(self, backend, count, timeout=2.0):
+        deadline = time.perf_counter() + timeout
+        while len(backend.injected) < count:
+            if time.perf_counter() > deadline:
+                self.fail(f"only {len(backend.injected)} of {count} events injected")
+            time.sleep(0.001)
+
+    def test_injects_every_event_in_order(self):
+        actions = EventBuffer()
+        shift, left = actions.intern('shift'), actions.intern('left')
+        actions.append_event(EV_KEY_DOWN, 0, shift)
+        actions.append_event(EV_MOVE, 2 * MS, 10, 20)
+        actions.append_event(EV_MOUSE_DOWN, 4 * MS, left, 10, 20)
+        actions.append_event(EV_MOUSE_UP, 6 * MS, left, 10, 20)
+        actions.append_event(EV_SCROLL, 8 * MS, 0, -2)
+        actions.append_event(EV_KEY_UP, 10 * MS, shift)
+        _, backend, _ = self.play(actions, repeat_count=2)
+        injected = [event[1:] for event in backend.injected]
+        once = [
+            ('key_down', 'shift'), ('move', 10, 20), ('mouse_down', 'left', 10, 20),
+            ('mouse_up', 'left', 10, 20), ('scroll', 0, -2), ('key_up', 'shift'),
+        ]
+        self.assertEqual(injected, once * 2)
+
+    def test_keeps_recorded_timing(self):
+        _, backend, elapsed_ns = self.play(keystrokes(5, 40 * MS))
+        self.assertGreaterEqual(elapsed_ns, 180 * MS)
+        timestamps = [event[0] for event in backend.injected]
+        # Relative to the first event, no event is early
+        for index, timestamp_ns in enumerate(timestamps):
+            self.assertGreaterEqual(timestamp_ns - timestamps[0], index * 20 * MS)
+
+    def test_speed(self):
+        _, _, elapsed_ns = self.play(keystrokes(5, 40 * MS), speed=4.0)
+        self.assertGreaterEqual(elapsed_ns, 45 * MS)
+        self.assertLess(elapsed_ns, 150 * MS)
+
+    def test_speed_change_while_playing(self):
+        session, backend, thread = self.start(keystrokes(10, 100 * MS))
+        self.wait_for(backend, 2)
+        session.set_speed(50.0)
+        thread.join(1.0)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(backend.injected), 20)
+
+    def test_max_gap(self):
+        actions = keystrokes(2, 0)
+        actions.append_event(EV_MOVE, 3000 * MS, 1, 1)
+        _, backend, elapsed_ns = self.play(actions, max_gap_ns=50 * MS)
+        self.assertLess(elapsed_ns, 500 * MS)
+        gap_ns = backend.injected[-1][0] - backend.injected[-2][0]
+        self.assertGreaterEqual(gap_ns, 45 * MS)
+
+    def test_invalid_max_gap(self):
+        for max_gap_ns in (-1, float('nan')):
+            with self.subTest(max_gap_ns=max_gap_ns):
+                with self.assertRaises(ValueError):
+                    PlaybackSession(keystrokes(1, MS), 1, max_gap_ns=max_gap_ns, backend=FakeBackend())
+                with self.assertRaises(ValueError):
+                    PlaybackScheduler(max_gap_ns=max_gap_ns)
+
+    def test_pause_and_resume(self):
+        session, backend, thread = self.start(keystrokes(4, 30 * MS))
+        self.wait_for(backend, 1)
+        session.pause_playback()
+        time.sleep(0.05)
+        paused_at = len(backend.injected)
+        time.sleep(0.15)
+        self.assertEqual(len(backend.injected), paused_at)
+        self.assertTrue(session.is_paused())
+        session.resume_playback()
+        thread.join(2.0)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(backend.injected), 8)
+
+    def test_stop_during_gap_releases_keys(self):
+        actions = EventBuffer()
+        a = actions.intern('a')
+        actions.append_event(EV_KEY_DOWN, 0, a)
+        actions.append_event(EV_KEY_UP, 10_000 * MS, a)
+        session, backend, thread = self.start(actions)
+        self.wait_for(backend, 1)
+        session.stop_playback()
+        thread.join(1.0)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual([event[1:] for event in backend.injected], [('key_down', 'a'), ('key_up', 'a')])
+        self.assertLess(session.stop_latency_ns, 500 * MS)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,240 +2,80 @@ import sys
 import time
 import logging
 from pynput import keyboard as pynput_keyboard
-from pynput import mouse as pynput_mouse
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QVBoxLayout,
-    QHBoxLayout, QSpinBox, QProgressBar, QMessageBox
+    QHBoxLayout, QSpinBox, QDoubleSpinBox, QProgressBar, QMessageBox,
+    QPushButton, QFileDialog, QDialog, QLineEdit, QTableWidget, QTableWidgetItem,
+    QAbstractItemView, QHeaderView, QInputDialog
 )
-from PyQt5.QtCore import QThread, pyqtSignal, Qt, QObject
-
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename='macro_recorder.log',
-    filemode='w'  # Overwrite log file on each run
+from PyQt5.QtCore import pyqtSignal, Qt, QObject
+from macro_core import (
+    MacroRecorder, MacroPlayer, EventBuffer, configure_logging, save_macro, load_macro, load_journal,
+    MACRO_FILE_EXTENSION, JOURNAL_EXTENSION, MIN_PLAYBACK_SPEED, MAX_PLAYBACK_SPEED
 )
+from macro_library import MacroLibrary
 
-class MacroRecorder(QThread):
+PROGRESS_BAR_RESOLUTION = 1000  # Progress bar ticks, independent of steps x repeats
+# Recordings stream here as they are captured; overwritten by the next recording,
+# and loadable like any journal to recover one cut short by a crash
+AUTOSAVE_JOURNAL = 'macro_autosave' + JOURNAL_EXTENSION
+
+class EngineAdapter(QObject):
+    # Thin Qt front for a macro_core engine. The engine reports on its own thread;
+    # re-emitting through signals lets Qt queue the calls onto the GUI thread.
     finished = pyqtSignal()
+    progress_update = pyqtSignal('qlonglong', 'qlonglong')  # completed_steps, total_steps
     status_update = pyqtSignal(str)
 
-    def __init__(self):
+    def __init__(self, engine):
         super().__init__()
-        self.recording = False
-        self.actions = []
-        self.start_time = None
-        self.last_action_time = None  # To track the absolute time of the last action
-        self.keyboard_listener = None
-        self.mouse_listener = None
-
-    def run(self):
-        self.recording = True
-        self.start_time = time.time()
-        self.last_action_time = self.start_time  # Initialize last_action_time
-        self.status_update.emit("Recording Started")
-        logging.info("Recording Started")
-
-        # Set up listeners using context managers to ensure proper cleanup
-        with pynput_keyboard.Listener(
-            on_press=self.on_key_press,
-            on_release=self.on_key_release
-        ) as self.keyboard_listener, \
-             pynput_mouse.Listener(
-                 on_move=self.on_mouse_move,
-                 on_click=self.on_mouse_click,
-                 on_scroll=self.on_mouse_scroll
-             ) as self.mouse_listener:
-            try:
-                while self.recording:
-                    time.sleep(0.01)
-            except Exception as e:
-                logging.error(f"Recording Error: {e}")
-                self.status_update.emit(f"Recording Error: {e}")
-            finally:
-                self.recording = False
-                self.status_update.emit("Recording Finished")
-                logging.info("Recording Finished")
-                self.finished.emit()
+        self.engine = engine
+        engine.subscribe('finished', self.finished.emit)
+        engine.subscribe('progress', self.progress_update.emit)
+        engine.subscribe('status', self.status_update.emit)
 
-    def stop(self):
-        self.recording = False
+    def start(self):
+        self.engine.start()
 
-    def on_key_press(self, key):
-        if not self.recording:
-            return
-        current_time = time.time()
-        delta = current_time - self.last_action_time
-        self.last_action_time = current_time
-        key_name = self.get_key_name(key)
-        self.actions.append(('key_down', key_name, delta))
-        logging.debug(f"Key Pressed: {key_name} | Delta Time: {delta}")
-
-    def on_key_release(self, key):
-        if not self.recording:
-            return
-        current_time = time.time()
-        delta = current_time - self.last_action_time
-        self.last_action_time = current_time
-        key_name = self.get_key_name(key)
-        self.actions.append(('key_up', key_name, delta))
-        logging.debug(f"Key Released: {key_name} | Delta Time: {delta}")
-
-    def on_mouse_move(self, x, y):
-        if not self.recording:
-            return
-        current_time = time.time()
-        delta = current_time - self.last_action_time
-        self.last_action_time = current_time
-        self.actions.append(('move', x, y, delta))
-        logging.debug(f"Mouse Moved to ({x}, {y}) | Delta Time: {delta}")
-
-    def on_mouse_click(self, x, y, button, pressed):
-        if not self.recording:
-            return
-        current_time = time.time()
-        delta = current_time - self.last_action_time
-        self.last_action_time = current_time
-        action = 'mouse_down' if pressed else 'mouse_up'
-        self.actions.append((action, button.name, x, y, delta))
-        logging.debug(f"Mouse {'Pressed' if pressed else 'Released'}: {button.name} at ({x}, {y}) | Delta Time: {delta}")
-
-    def on_mouse_scroll(self, x, y, dx, dy):
-        if not self.recording:
-            return
-        current_time = time.time()
-        delta = current_time - self.last_action_time
-        self.last_action_time = current_time
-        self.actions.append(('scroll', dx, dy, delta))
-        logging.debug(f"Mouse Scrolled: dx={dx}, dy={dy} at ({x}, {y}) | Delta Time: {delta}")
-
-    @staticmethod
-    def get_key_name(key):
-        try:
-            return key.char
-        except AttributeError:
-            return str(key).replace('Key.', '')
+    def isRunning(self):
+        return self.engine.is_running()
 
-class MacroPlayer(QThread):
-    finished = pyqtSignal()
-    progress_update = pyqtSignal(int)
-    status_update = pyqtSignal(str)
+    def wait(self):
+        self.engine.wait()
 
-    def __init__(self, actions, repeat_count):
-        super().__init__()
-        self.actions = actions
-        self.repeat_count = repeat_count
-        self.is_playing = True
-        self.pressed_keys = set()
-        self.pressed_buttons = set()
-
-    def run(self):
-        self.status_update.emit("Playing Macro")
-        logging.info("Playback Started")
-        keyboard_controller = pynput_keyboard.Controller()
-        mouse_controller = pynput_mouse.Controller()
+class QtMacroRecorder(EngineAdapter):
+    def __init__(self, **options):
+        super().__init__(MacroRecorder(**options))
 
-        try:
-            for i in range(self.repeat_count):
-                if not self.is_playing:
-                    logging.info("Playback Stopped by User")
-                    break
-                logging.info(f"Starting iteration {i + 1} of {self.repeat_count}")
-                for action in self.actions:
-                    if not self.is_playing:
-                        logging.info("Playback Stopped by User during iteration")
-                        break
-                    action_type = action[0]
-                    delta_time = action[-1]
-                    if delta_time > 0:
-                        time.sleep(delta_time)
-                    self.execute_action(action, keyboard_controller, mouse_controller)
-                self.progress_update.emit(i + 1)
-                logging.info(f"Completed iteration {i + 1} of {self.repeat_count}")
-            if self.is_playing:
-                self.status_update.emit("Playback Finished")
-                logging.info("Playback Finished Successfully")
-            else:
-                self.status_update.emit("Playback Stopped")
-        except Exception as e:
-            logging.error(f"Playback Error: {e}")
-            self.status_update.emit(f"Playback Error: {e}")
-        finally:
-            # Release any remaining pressed keys and buttons
-            self.release_all(keyboard_controller, mouse_controller)
-            self.finished.emit()
+    def recorded_actions(self):
+        # Everything captured: the journaled events plus the tail still in memory
+        return self.engine.session.recorded_actions()
+
+    def stop(self):
+        self.engine.stop()
+
+class QtMacroPlayer(EngineAdapter):
+    def __init__(self, actions, repeat_count, speed=1.0, max_gap_ns=None):
+        super().__init__(MacroPlayer(actions, repeat_count, speed=speed, max_gap_ns=max_gap_ns))
+
+    @property
+    def repeat_count(self):
+        return self.engine.session.repeat_count
 
     def stop_playback(self):
-        self.is_playing = False
-
-    def execute_action(self, action, keyboard_controller, mouse_controller):
-        action_type = action[0]
-        if action_type in ['key_down', 'key_up']:
-            key = self.get_key(action[1])
-            if key is None:
-                logging.warning(f"Unrecognized key: {action[1]}")
-                return
-            if action_type == 'key_down':
-                keyboard_controller.press(key)
-                self.pressed_keys.add(key)
-                logging.debug(f"Key Pressed: {action[1]}")
-            else:
-                keyboard_controller.release(key)
-                self.pressed_keys.discard(key)
-                logging.debug(f"Key Released: {action[1]}")
-        elif action_type == 'move':
-            _, x, y, _ = action
-            mouse_controller.position = (x, y)
-            logging.debug(f"Mouse Moved to ({x}, {y})")
-        elif action_type in ['mouse_down', 'mouse_up']:
-            button = self.get_button(action[1])
-            if button is None:
-                logging.warning(f"Unrecognized mouse button: {action[1]}")
-                return
-            if action_type == 'mouse_down':
-                mouse_controller.press(button)
-                self.pressed_buttons.add(button)
-                logging.debug(f"Mouse Button Pressed: {action[1]}")
-            else:
-                mouse_controller.release(button)
-                self.pressed_buttons.discard(button)
-                logging.debug(f"Mouse Button Released: {action[1]}")
-        elif action_type == 'scroll':
-            _, dx, dy, _ = action
-            mouse_controller.scroll(dx, dy)
-            logging.debug(f"Mouse Scrolled: dx={dx}, dy={dy}")
-        else:
-            logging.warning(f"Unknown action type: {action_type}")
-
-    def release_all(self, keyboard_controller, mouse_controller):
-        logging.info("Releasing all pressed keys and mouse buttons")
-        for key in list(self.pressed_keys):
-            keyboard_controller.release(key)
-            logging.debug(f"Released Key: {key}")
-        for button in list(self.pressed_buttons):
-            mouse_controller.release(button)
-            logging.debug(f"Released Mouse Button: {button}")
-        self.pressed_keys.clear()
-        self.pressed_buttons.clear()
-
-    @staticmethod
-    def get_key(key_name):
-        try:
-            if len(key_name) == 1:
-                return key_name
-            return getattr(pynput_keyboard.Key, key_name.lower())
-        except AttributeError:
-            logging.error(f"Key mapping failed for: {key_name}")
-            return None  # Return None to indicate an unmapped key
-
-    @staticmethod
-    def get_button(button_name):
-        try:
-            return getattr(pynput_mouse.Button, button_name)
-        except AttributeError:
-            logging.error(f"Button mapping failed for: {button_name}")
-            return None  # Return None to indicate an unmapped button
+        self.engine.stop_playback()
+
+    def pause_playback(self):
+        self.engine.pause_playback()
+
+    def resume_playback(self):
+        self.engine.resume_playback()
+
+    def is_paused(self):
+        return self.engine.is_paused()
+
+    def set_speed(self, speed):
+        self.engine.set_speed(speed)
 
 class HotkeyListener(QObject):
     # Define signals for each hotkey
@@ -243,6 +83,7 @@ class HotkeyListener(QObject):
     stop_recording_signal = pyqtSignal()
     start_playback_signal = pyqtSignal()
     stop_playback_signal = pyqtSignal()
+    toggle_pause_signal = pyqtSignal()
 
     def __init__(self):
         super().__init__()
@@ -250,7 +91,8 @@ class HotkeyListener(QObject):
             '<ctrl>+z': self.start_recording,
             '<ctrl>+x': self.stop_recording,
             '<ctrl>+c': self.start_playback,
-            '<ctrl>+v': self.stop_playback
+            '<ctrl>+v': self.stop_playback,
+            '<ctrl>+b': self.toggle_pause
         })
 
     def start_listener(self):
@@ -277,13 +119,105 @@ class HotkeyListener(QObject):
         logging.info("Hotkey Triggered: Stop Playback")
         self.stop_playback_signal.emit()
 
+    def toggle_pause(self):
+        logging.info("Hotkey Triggered: Pause/Resume Playback")
+        self.toggle_pause_signal.emit()
+
+class LibraryDialog(QDialog):
+    # Browses the macro library's index; only the macro picked is opened
+    COLUMNS = ('Name', 'Created', 'Duration', 'Events', 'Tags')
+
+    def __init__(self, library, parent=None):
+        super().__init__(parent)
+        self.library = library
+        self.selected_actions = None
+        self.setWindowTitle('Macro Library')
+        self.resize(560, 400)
+
+        layout = QVBoxLayout()
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Search by name, or tag:<tag> / key:<key>")
+        self.search_edit.textChanged.connect(self.refresh)
+        layout.addWidget(self.search_edit)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.cellDoubleClicked.connect(self.open_selected)
+        layout.addWidget(self.table)
+
+        button_layout = QHBoxLayout()
+        self.open_button = QPushButton('Open')
+        self.open_button.clicked.connect(self.open_selected)
+        self.delete_button = QPushButton('Delete')
+        self.delete_button.clicked.connect(self.delete_selected)
+        close_button = QPushButton('Close')
+        close_button.clicked.connect(self.reject)
+        button_layout.addWidget(self.open_button)
+        button_layout.addWidget(self.delete_button)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+        self.refresh()
+
+    def refresh(self):
+        text = self.search_edit.text().strip()
+        filters = {}
+        if text.startswith('tag:'):
+            filters['tag'] = text[4:].strip()
+        elif text.startswith('key:'):
+            filters['key'] = text[4:].strip()
+        else:
+            filters['search'] = text
+        entries = self.library.entries(**filters)
+        self.table.setRowCount(len(entries))
+        for row, entry in enumerate(entries):
+            created = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['created_ns'] / 1e9))
+            cells = (
+                entry['name'], created, f"{entry['duration_ns'] / 1e9:.1f} s",
+                str(entry['events']), ', '.join(entry['tags'])
+            )
+            for column, value in enumerate(cells):
+                item = QTableWidgetItem(value)
+                item.setData(Qt.UserRole, entry['id'])
+                self.table.setItem(row, column, item)
+
+    def selected_id(self):
+        items = self.table.selectedItems()
+        return items[0].data(Qt.UserRole) if items else None
+
+    def open_selected(self):
+        macro_id = self.selected_id()
+        if macro_id is None:
+            return
+        try:
+            self.selected_actions = self.library.open(macro_id)
+        except (OSError, ValueError) as e:
+            logging.error(f"Opening library macro failed: {e}")
+            QMessageBox.warning(self, "Warning", f"Could not open macro: {e}")
+            return
+        self.accept()
+
+    def delete_selected(self):
+        macro_id = self.selected_id()
+        if macro_id is None:
+            return
+        if QMessageBox.question(self, "Delete Macro", "Delete the selected macro from the library?") != QMessageBox.Yes:
+            return
+        self.library.remove(macro_id)
+        self.refresh()
+
 class MacroRecorderGUI(QWidget):
     def __init__(self):
         super().__init__()
         self.initUI()
         self.macro_recorder = None
         self.macro_player = None
-        self.recorded_actions = []
+        self.recorded_actions = EventBuffer()
+        self.library = None  # Opened on first use
         self.hotkey_listener = HotkeyListener()
 
         # Connect hotkey signals to GUI slots
@@ -291,14 +225,15 @@ class MacroRecorderGUI(QWidget):
         self.hotkey_listener.stop_recording_signal.connect(self.stop_recording)
         self.hotkey_listener.start_playback_signal.connect(self.play_macro)
         self.hotkey_listener.stop_playback_signal.connect(self.stop_macro)
+        self.hotkey_listener.toggle_pause_signal.connect(self.toggle_pause)
 
         # Start the hotkey listener
         self.hotkey_listener.start_listener()
 
     def initUI(self):
         self.setWindowTitle('Macro Recorder')
-        self.setGeometry(100, 100, 400, 250)
-        self.setFixedSize(400, 250)  # Fixed window size for consistency
+        self.setGeometry(100, 100, 400, 405)
+        self.setFixedSize(400, 405)  # Fixed window size for consistency
 
         main_layout = QVBoxLayout()
 
@@ -320,7 +255,8 @@ class MacroRecorderGUI(QWidget):
             ('Start Recording', 'Ctrl + Z'),
             ('Stop Recording', 'Ctrl + X'),
             ('Start Replay', 'Ctrl + C'),
-            ('Stop Replay', 'Ctrl + V')
+            ('Stop Replay', 'Ctrl + V'),
+            ('Pause / Resume Replay', 'Ctrl + B')
         ]
 
         for action, shortcut in shortcuts:
@@ -347,13 +283,61 @@ class MacroRecorderGUI(QWidget):
         repeat_layout.addWidget(self.repeat_spinbox)
         main_layout.addLayout(repeat_layout)
 
+        # Playback Speed Selection
+        speed_layout = QHBoxLayout()
+        speed_label = QLabel('Playback Speed:')
+        self.speed_spinbox = QDoubleSpinBox()
+        self.speed_spinbox.setRange(MIN_PLAYBACK_SPEED, MAX_PLAYBACK_SPEED)
+        self.speed_spinbox.setSingleStep(0.25)
+        self.speed_spinbox.setValue(1.0)
+        self.speed_spinbox.setSuffix('x')
+        self.speed_spinbox.setToolTip("Replay faster or slower than recorded; can be changed during playback.")
+        self.speed_spinbox.valueChanged.connect(self.change_speed)
+        speed_layout.addWidget(speed_label)
+        speed_layout.addWidget(self.speed_spinbox)
+        main_layout.addLayout(speed_layout)
+
+        # Idle Gap Limit
+        gap_layout = QHBoxLayout()
+        gap_label = QLabel('Max Idle Gap:')
+        self.gap_spinbox = QDoubleSpinBox()
+        self.gap_spinbox.setRange(0.0, 3600.0)
+        self.gap_spinbox.setSingleStep(0.5)
+        self.gap_spinbox.setValue(0.0)
+        self.gap_spinbox.setSuffix(' s')
+        self.gap_spinbox.setSpecialValueText('Off')
+        self.gap_spinbox.setToolTip("Shorten recorded pauses longer than this (0 keeps them as recorded).")
+        gap_layout.addWidget(gap_label)
+        gap_layout.addWidget(self.gap_spinbox)
+        main_layout.addLayout(gap_layout)
+
         # Progress Bar
         self.progress_bar = QProgressBar()
         self.progress_bar.setMinimum(0)
-        self.progress_bar.setMaximum(100)  # Will be updated dynamically
+        self.progress_bar.setMaximum(PROGRESS_BAR_RESOLUTION)  # Step counts are scaled onto this range
         self.progress_bar.setValue(0)
         main_layout.addWidget(self.progress_bar)
 
+        # Save / Load Buttons
+        file_layout = QHBoxLayout()
+        self.save_button = QPushButton('Save Macro...')
+        self.save_button.clicked.connect(self.save_macro)
+        self.load_button = QPushButton('Load Macro...')
+        self.load_button.clicked.connect(self.load_macro)
+        file_layout.addWidget(self.save_button)
+        file_layout.addWidget(self.load_button)
+        main_layout.addLayout(file_layout)
+
+        # Library Buttons
+        library_layout = QHBoxLayout()
+        self.library_save_button = QPushButton('Save to Library...')
+        self.library_save_button.clicked.connect(self.save_to_library)
+        self.library_button = QPushButton('Browse Library...')
+        self.library_button.clicked.connect(self.browse_library)
+        library_layout.addWidget(self.library_save_button)
+        library_layout.addWidget(self.library_button)
+        main_layout.addLayout(library_layout)
+
         self.setLayout(main_layout)
 
     def start_recording(self):
@@ -366,7 +350,7 @@ class MacroRecorderGUI(QWidget):
             self.macro_recorder.stop()
             self.macro_recorder.wait()
 
-        self.macro_recorder = MacroRecorder()
+        self.macro_recorder = QtMacroRecorder(journal_path=AUTOSAVE_JOURNAL)
         self.macro_recorder.finished.connect(self.on_recording_finished)
         self.macro_recorder.status_update.connect(self.update_status)
         self.macro_recorder.start()
@@ -383,11 +367,113 @@ class MacroRecorderGUI(QWidget):
         logging.info("Stopping recording via GUI")
 
     def on_recording_finished(self):
+        error = self.macro_recorder.engine.error
+        if error is not None:
+            # Keep the previous macro rather than replace it with an empty one
+            self.update_status(f"Recording Error: {error}")
+            self.macro_recorder = None
+            return
         self.update_status("Recording Finished")
-        self.recorded_actions = self.macro_recorder.actions.copy()
+        try:
+            self.recorded_actions = self.macro_recorder.recorded_actions()
+        except (OSError, ValueError) as e:
+            # The autosave journal is left in place for a later load
+            logging.error(f"Reading the recording back failed: {e}")
+            self.update_status(f"Recording Error: {e}")
+            self.macro_recorder = None
+            return
         logging.info(f"Recorded Actions: {len(self.recorded_actions)} actions recorded")
         self.macro_recorder = None
 
+    def save_macro(self):
+        if self.macro_player and self.macro_player.isRunning():
+            # The player may be reading the very file being replaced
+            QMessageBox.warning(self, "Warning", "Playback is in progress.")
+            return
+        if not self.recorded_actions:
+            QMessageBox.information(self, "Info", "No recorded actions to save.")
+            return
+
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Save Macro", f"macro{MACRO_FILE_EXTENSION}", f"Macro Files (*{MACRO_FILE_EXTENSION})"
+        )
+        if not path:
+            return
+        try:
+            save_macro(path, self.recorded_actions)
+        except (OSError, ValueError) as e:
+            logging.error(f"Saving macro failed: {e}")
+            QMessageBox.warning(self, "Warning", f"Could not save macro: {e}")
+            return
+        self.update_status("Macro Saved")
+
+    def load_macro(self):
+        if self.macro_player and self.macro_player.isRunning():
+            QMessageBox.warning(self, "Warning", "Playback is in progress.")
+            return
+
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Load Macro", "",
+            f"Macro Files (*{MACRO_FILE_EXTENSION});;Recording Journals (*{JOURNAL_EXTENSION})"
+        )
+        if not path:
+            return
+        try:
+            if path.lower().endswith(JOURNAL_EXTENSION):
+                # Also recovers recordings interrupted by a crash
+                self.recorded_actions = load_journal(path)
+            else:
+                self.recorded_actions = load_macro(path)
+        except (OSError, ValueError) as e:
+            logging.error(f"Loading macro failed: {e}")
+            QMessageBox.warning(self, "Warning", f"Could not load macro: {e}")
+            return
+        self.update_status(f"Macro Loaded ({len(self.recorded_actions)} actions)")
+
+    def open_library(self):
+        if self.library is None:
+            try:
+                self.library = MacroLibrary()
+            except (OSError, ValueError) as e:
+                logging.error(f"Opening macro library failed: {e}")
+                QMessageBox.warning(self, "Warning", f"Could not open the macro library: {e}")
+        return self.library
+
+    def save_to_library(self):
+        if not self.recorded_actions:
+            QMessageBox.information(self, "Info", "No recorded actions to save.")
+            return
+        library = self.open_library()
+        if library is None:
+            return
+
+        name, ok = QInputDialog.getText(self, "Save to Library", "Name:")
+        if not ok or not name.strip():
+            return
+        tags, ok = QInputDialog.getText(self, "Save to Library", "Tags (comma separated):")
+        if not ok:
+            return
+        try:
+            library.add(name.strip(), self.recorded_actions, [tag.strip() for tag in tags.split(',') if tag.strip()])
+        except (OSError, ValueError) as e:
+            logging.error(f"Saving macro to library failed: {e}")
+            QMessageBox.warning(self, "Warning", f"Could not save macro: {e}")
+            return
+        self.update_status("Macro Saved to Library")
+
+    def browse_library(self):
+        if self.macro_player and self.macro_player.isRunning():
+            QMessageBox.warning(self, "Warning", "Playback is in progress.")
+            return
+        library = self.open_library()
+        if library is None:
+            return
+
+        dialog = LibraryDialog(library, self)
+        if dialog.exec_() == QDialog.Accepted and dialog.selected_actions is not None:
+            self.recorded_actions = dialog.selected_actions
+            self.update_status(f"Macro Loaded ({len(self.recorded_actions)} actions)")
+
     def play_macro(self):
         if not self.recorded_actions:
             QMessageBox.information(self, "Info", "No recorded actions to play.")
@@ -398,12 +484,15 @@ class MacroRecorderGUI(QWidget):
             return
 
         repeat_count = self.repeat_spinbox.value()
-        self.macro_player = MacroPlayer(self.recorded_actions, repeat_count)
+        max_gap_ns = int(self.gap_spinbox.value() * 1e9) or None
+        self.macro_player = QtMacroPlayer(
+            self.recorded_actions, repeat_count,
+            speed=self.speed_spinbox.value(), max_gap_ns=max_gap_ns
+        )
         self.macro_player.finished.connect(self.on_playback_finished)
         self.macro_player.progress_update.connect(self.update_progress)
         self.macro_player.status_update.connect(self.update_status)
         self.macro_player.start()
-        self.progress_bar.setMaximum(repeat_count)
         self.progress_bar.setValue(0)
         self.update_status("Playback Started")
         logging.info(f"Playback started with repeat count: {repeat_count}")
@@ -417,15 +506,41 @@ class MacroRecorderGUI(QWidget):
         self.update_status("Stopping Playback...")
         logging.info("Stopping playback via GUI")
 
+    def change_speed(self, speed):
+        if self.macro_player and self.macro_player.isRunning():
+            self.macro_player.set_speed(speed)
+            logging.info(f"Playback speed changed to {speed}x via GUI")
+
+    def toggle_pause(self):
+        if not self.macro_player or not self.macro_player.isRunning():
+            QMessageBox.warning(self, "Warning", "No playback is in progress.")
+            return
+
+        if self.macro_player.is_paused():
+            self.macro_player.resume_playback()
+            self.update_status("Playing Macro")
+            logging.info("Resuming playback via GUI")
+        else:
+            self.macro_player.pause_playback()
+            self.update_status("Playback Paused")
+            logging.info("Pausing playback via GUI")
+
     def on_playback_finished(self):
         self.update_status("Playback Finished")
         self.progress_bar.setValue(0)
+        self.progress_bar.resetFormat()
         logging.info("Playback finished")
         self.macro_player = None
 
-    def update_progress(self, value):
-        self.progress_bar.setValue(value)
-        logging.debug(f"Playback Progress: {value}/{self.repeat_spinbox.value()}")
+    def update_progress(self, done, total):
+        # Arrives at most PROGRESS_RATE_HZ (macro_core) times per second, however short the macro
+        if not total or self.macro_player is None:
+            return
+        repeat_count = self.macro_player.repeat_count
+        iteration = min(done * repeat_count // total + 1, repeat_count)
+        self.progress_bar.setValue(done * PROGRESS_BAR_RESOLUTION // total)
+        self.progress_bar.setFormat(f"{iteration}/{repeat_count} (%p%)")
+        logging.debug("Playback Progress: %s/%s steps", done, total)
 
     def update_status(self, status):
         self.status_label.setText(f"Status: {status}")
@@ -445,9 +560,12 @@ class MacroRecorderGUI(QWidget):
         # Stop the hotkey listener
         if self.hotkey_listener:
             self.hotkey_listener.stop_listener()
+        if self.library:
+            self.library.close()
         event.accept()
 
 def main():
+    configure_logging()
     app = QApplication(sys.argv)
     gui = MacroRecorderGUI()
     gui.show()